@@ -1,80 +1,801 @@
+"""
+AI-generated portfolio and account insights via OpenAI.
 
+Falls back to deterministic mock insights when no API key is configured or
+OpenAI is failing. Calls are rate limited, retried with backoff, guarded by
+a circuit breaker and cached in process and in the completion_cache table.
+"""
+import asyncio
+import hashlib
 import os
-from typing import List, Optional
-from datetime import datetime
-import json
+import random
+import re
+import threading
+import time
+import weakref
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from datetime import datetime, timedelta, timezone
 import logging
 
+from pydantic import BaseModel
+from sqlmodel import Session, delete
+
 from . import models
 from . import schemas
 from . import playbooks
+from . import serialization
+from .database import engine
 
 # Check if OpenAI is available
 try:
-    from openai import OpenAI
+    from openai import (
+        AsyncOpenAI,
+        DefaultAsyncHttpxClient,
+        APIConnectionError,
+        InternalServerError,
+        RateLimitError,
+    )
+    import httpx
     OPENAI_AVAILABLE = True
+    # Transient failures retried with backoff (APITimeoutError is an APIConnectionError)
+    RETRYABLE_ERRORS: tuple = (RateLimitError, APIConnectionError, InternalServerError)
 except ImportError:
     OPENAI_AVAILABLE = False
-    OpenAI = None
+    AsyncOpenAI = None
+    RETRYABLE_ERRORS = ()
+
+# HTTP/2 lets concurrent completions share one connection (needs the h2 package)
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Markdown code block around a JSON payload: ```json\n{...}\n``` or ```{...}```
+JSON_BLOCK_RE = re.compile(r'```(?:json)?\s*\n?(.*?)\n?```', re.DOTALL)
+
+# Chat completions allowed in flight at once per event loop
+OPENAI_MAX_CONCURRENT = int(os.getenv("OPENAI_MAX_CONCURRENT", "8"))
+
+# Per-request timeout; the SDK default of 10 minutes would outlive any HTTP caller
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60"))
+
+# Client-side throttling to stay under the account's limits (0 disables a bucket)
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "0"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "0"))
+
+# Attempts per completion and exponential backoff between them, in seconds
+OPENAI_MAX_ATTEMPTS = 5
+OPENAI_RETRY_BASE_DELAY = 0.5
+OPENAI_RETRY_MAX_DELAY = 20.0
+
+# Ask for schema-constrained JSON (Structured Outputs). Set to false for
+# models that only support json_object mode.
+OPENAI_STRUCTURED_OUTPUTS = os.getenv("OPENAI_STRUCTURED_OUTPUTS", "true").lower() in ("1", "true", "yes")
+
+# Consecutive failed completions that open the circuit, and how long it stays
+# open before one trial request is let through
+OPENAI_CIRCUIT_THRESHOLD = int(os.getenv("OPENAI_CIRCUIT_THRESHOLD", "5"))
+OPENAI_CIRCUIT_RESET_SECONDS = float(os.getenv("OPENAI_CIRCUIT_RESET_SECONDS", "30"))
+
+# How long a parsed OpenAI response is reused for an identical prompt
+INSIGHT_CACHE_TTL_SECONDS = 300
+INSIGHT_CACHE_MAX_ENTRIES = 512
+
+# Second cache layer in the database, so responses survive restarts and are
+# shared between Lambda instances (0 disables it)
+INSIGHT_CACHE_DB_TTL_SECONDS = int(os.getenv("INSIGHT_CACHE_DB_TTL_SECONDS", "3600"))
+# Expired rows are deleted at most this often per process; reads already
+# ignore them, so they only cost table space in between
+INSIGHT_CACHE_DB_PRUNE_SECONDS = 600
+
+# Accounts packed into one batched completion, and batches in flight at once.
+# At ~800 output tokens per account, 20 keeps a batch reply within 16k tokens.
+ACCOUNT_BATCH_MAX_SIZE = 20
+ACCOUNT_BATCH_CONCURRENCY = 4
+ACCOUNT_BATCH_MAX_TOKENS = 16000
+
+PORTFOLIO_SYSTEM_PROMPT = "You are a Customer Success leader preparing executive insights. Be concise and factual. Always respond with valid JSON only."
+ACCOUNT_SYSTEM_PROMPT = "You are a CSM preparing an account review. Be concise and fact-based. Always respond with valid JSON only."
+
+# The playbook library is static, so its prompt listing is built once
+PLAYBOOKS_PROMPT_LIST = "\n".join(f"- {p['title']}: {p['description']}" for p in playbooks.PLAYBOOKS_LIBRARY)
+
+# Static instructions lead each user prompt and the data JSON comes last, so
+# every call shares the longest possible prefix for OpenAI prompt caching
+PORTFOLIO_INSTRUCTIONS = """You are a Customer Success leader. Using the JSON portfolio snapshot, write:
+1) A 120–160 word executive summary for the VP CS.
+2) 3 priority actions for the next 30 days.
+3) A one-line "what changed this week" note.
+
+Keep it concise, factual, and free of hallucinations. If data is missing, say so."""
+
+ACCOUNT_INSTRUCTIONS = f"""You are a CSM preparing an account review. Given the account JSON below with health score, top factors, tickets, NPS, and ARR, produce:
+- 3 bullet insights (facts, not guesses).
+- 3 recommended plays from the provided playbook list.
+- A 1-sentence executive note.
+
+Keep it concise and factual. If data is missing, say so.
+
+Available Playbooks:
+{PLAYBOOKS_PROMPT_LIST}"""
+
+ACCOUNT_BATCH_INSTRUCTIONS = f"""You are a CSM preparing account reviews. For EACH account in the JSON array below (with health score, top factors, tickets, NPS, and ARR), produce:
+- 3 bullet insights (facts, not guesses).
+- 3 recommended plays from the provided playbook list.
+- A 1-sentence executive note.
+
+Keep it concise and factual. If data is missing, say so. Return exactly one entry per account, tagged with its account_id.
+
+Available Playbooks:
+{PLAYBOOKS_PROMPT_LIST}"""
+
+
+# Longest list embedded in a prompt
+PROMPT_MAX_LIST_ITEMS = 20
+
+
+def _compact_for_prompt(value):
+    """
+    Shrink data before it is embedded in a prompt: floats rounded to one
+    decimal, None and empty values dropped, lists capped at PROMPT_MAX_LIST_ITEMS.
+    """
+    if isinstance(value, float):
+        return round(value, 1)
+    if isinstance(value, dict):
+        compacted = {}
+        for key, item in value.items():
+            item = _compact_for_prompt(item)
+            if item is None or item == [] or item == {}:
+                continue
+            compacted[key] = item
+        return compacted
+    if isinstance(value, (list, tuple)):
+        return [_compact_for_prompt(item) for item in value[:PROMPT_MAX_LIST_ITEMS]]
+    return value
+
+
+def _strict_object(properties: dict) -> dict:
+    """JSON schema object in the shape strict Structured Outputs require"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+
+def _described(schema: dict, description: str) -> dict:
+    return {**schema, "description": description}
+
+
+_STRING = {"type": "string"}
+_STRING_LIST = {"type": "array", "items": _STRING}
+_ACCOUNT_REPLY_PROPERTIES = {
+    "summary": _described(_STRING, "1-sentence executive note"),
+    "health_analysis": _described(_STRING_LIST, "3 bullet insights (facts, not guesses)"),
+    "recommended_actions": {
+        "type": "array",
+        "description": "3 recommended plays from the provided playbook list",
+        "items": _strict_object({
+            "title": _described(_STRING, "Playbook name"),
+            "description": _described(_STRING, "Why this play fits the account"),
+            "priority": {"type": "string", "enum": ["High", "Medium", "Low"]},
+            "estimated_impact": _STRING
+        })
+    }
+}
+
+# Reply schemas for each prompt; generated_at and account fields are filled in locally
+PORTFOLIO_RESPONSE_SCHEMA = {
+    "name": "portfolio_insight",
+    "strict": True,
+    "schema": _strict_object({
+        "summary": _described(_STRING, "120-160 word executive summary"),
+        "key_findings": _described(_STRING_LIST, "3 priority actions for the next 30 days"),
+        "top_risks": _described(_STRING_LIST, "One-line 'what changed this week' note"),
+        "opportunities": _STRING_LIST
+    })
+}
+ACCOUNT_RESPONSE_SCHEMA = {
+    "name": "account_insight",
+    "strict": True,
+    "schema": _strict_object(_ACCOUNT_REPLY_PROPERTIES)
+}
+ACCOUNT_BATCH_RESPONSE_SCHEMA = {
+    "name": "account_insights",
+    "strict": True,
+    "schema": _strict_object({
+        "insights": {
+            "type": "array",
+            "items": _strict_object({"account_id": {"type": "integer"}, **_ACCOUNT_REPLY_PROPERTIES})
+        }
+    })
+}
+
+# Reply shape spelled out in the prompt when Structured Outputs are off
+PORTFOLIO_JSON_FORMAT = (
+    "IMPORTANT: Return ONLY valid JSON without any markdown formatting, code blocks, or explanatory text. Use this exact structure:\n"
+    '{"summary": "string", "key_findings": ["action1", "action2", "action3"], "top_risks": ["what changed note"], "opportunities": []}'
+)
+ACCOUNT_JSON_FORMAT = (
+    "IMPORTANT: Return ONLY valid JSON without any markdown formatting, code blocks, or explanatory text. Use this exact structure:\n"
+    '{"summary": "executive note", "health_analysis": ["insight1", "insight2", "insight3"], "recommended_actions": [{"title": "playbook name", "description": "why", "priority": "High/Medium/Low", "estimated_impact": "impact"}]}'
+)
+ACCOUNT_BATCH_JSON_FORMAT = (
+    "IMPORTANT: Return ONLY valid JSON without any markdown formatting, code blocks, or explanatory text. Use this exact structure:\n"
+    '{"insights": [{"account_id": 0, "summary": "executive note", "health_analysis": ["insight1", "insight2", "insight3"], "recommended_actions": [{"title": "playbook name", "description": "why", "priority": "High/Medium/Low", "estimated_impact": "impact"}]}]}'
+)
+
+# Fields the model may leave out of its reply
+PORTFOLIO_INSIGHT_DEFAULTS = {"summary": "", "key_findings": [], "top_risks": [], "opportunities": []}
+ACCOUNT_ACTION_DEFAULTS = {"title": "", "description": "", "priority": "Medium", "estimated_impact": ""}
+
+# Canned actions for the mock account insight, in the order they are offered
+MOCK_ACTION_TEMPLATES = (
+    ("Low user engagement", schemas.AccountAction(
+        title="Schedule Executive Business Review",
+        description="Conduct a strategic review to understand usage barriers and align on value realization",
+        priority="High",
+        estimated_impact="Could increase engagement by 40-50%"
+    )),
+    ("High support ticket volume", schemas.AccountAction(
+        title="Provide Technical Training",
+        description="Organize training sessions to reduce support dependency",
+        priority="High",
+        estimated_impact="Could reduce tickets by 60%"
+    )),
+    ("Low feature adoption", schemas.AccountAction(
+        title="Feature Adoption Workshop",
+        description="Guide users through underutilized features that match their use case",
+        priority="Medium",
+        estimated_impact="Could increase adoption by 30%"
+    )),
+)
+
+MOCK_DEFAULT_ACTION = schemas.AccountAction(
+    title="Regular Check-in Call",
+    description="Schedule monthly success check-ins to monitor progress",
+    priority="Medium",
+    estimated_impact="Improves relationship and early warning signals"
+)
+
+
+class _RateLimiter:
+    """
+    Request and token buckets refilled continuously up to per-minute limits,
+    as in OpenAI's parallel request processor. Callers wait in acquire()
+    until both buckets cover the request, then settle() the estimate against
+    the tokens actually used.
+    
+    The service singleton is shared by every event loop in the process, so
+    the buckets sit behind a thread lock (never held across an await).
+    """
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed_minutes = (now - self._updated) / 60
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(
+                self.requests_per_minute,
+                self._requests + self.requests_per_minute * elapsed_minutes
+            )
+        if self.tokens_per_minute:
+            self._tokens = min(
+                self.tokens_per_minute,
+                self._tokens + self.tokens_per_minute * elapsed_minutes
+            )
+    
+    async def acquire(self, tokens: int) -> None:
+        if self.tokens_per_minute:
+            # A single request larger than the bucket would never fit
+            tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                self._refill()
+                wait = 0.0
+                if self.requests_per_minute and self._requests < 1:
+                    wait = (1 - self._requests) * 60 / self.requests_per_minute
+                if self.tokens_per_minute and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+                if wait <= 0:
+                    if self.requests_per_minute:
+                        self._requests -= 1
+                    if self.tokens_per_minute:
+                        self._tokens -= tokens
+                    return
+            await asyncio.sleep(wait)
+    
+    def settle(self, estimated_tokens: int, used_tokens: int) -> None:
+        if self.tokens_per_minute:
+            with self._lock:
+                self._refill()
+                self._tokens = min(self.tokens_per_minute, self._tokens + estimated_tokens - used_tokens)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling OpenAI while the circuit breaker is open"""
+
+
+class _CircuitBreaker:
+    """
+    Stops calling OpenAI after `threshold` consecutive failed completions, so
+    callers fall back to mock insights at once instead of each waiting out
+    timeouts and retries. Once `reset_after` seconds pass, one trial request
+    is let through per period (half-open) until one succeeds and closes it.
+    Shared by every event loop in the process, hence the thread lock.
+    """
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_after:
+                return False
+            # Half-open: this request is the trial, the rest wait another period
+            self._opened_at = time.monotonic()
+        logger.info("OpenAI circuit half-open, sending a trial request")
+        return True
+    
+    def record_success(self) -> None:
+        with self._lock:
+            was_open = self._opened_at is not None
+            self._failures = 0
+            self._opened_at = None
+        if was_open:
+            logger.info("OpenAI circuit closed")
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures < self.threshold:
+                return
+            opened = self._opened_at is None
+            self._opened_at = time.monotonic()
+            failures = self._failures
+        if opened:
+            logger.warning(
+                "OpenAI circuit opened after %d consecutive failures, using mock insights for %.0fs",
+                failures, self.reset_after
+            )
 
 
 class AIInsightsService:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.model = os.getenv("OPENAI_MODEL", "gpt-5")  # Default to gpt-5 (advanced reasoning, 45% fewer hallucinations, 50-80% fewer tokens)
-        self.client = None
+        # prompt fingerprint -> (expires_at, parsed completion). Only resolved
+        # results are kept here: the singleton outlives event loops, and a
+        # task from one loop cannot be awaited on another.
+        self._completion_cache: Dict[str, Tuple[float, dict]] = {}
+        self._completion_lock = threading.Lock()
+        # In-flight completions per event loop, so identical concurrent
+        # requests on a loop share one call
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+        # monotonic time of the next completion_cache table prune
+        self._next_db_prune = 0.0
         
-        # Setup logging first
-        logging.basicConfig(level=logging.INFO)
-        self.logger = logging.getLogger("AIInsightsService")
+        # The OpenAI client is built on first use, so importing the app (cold
+        # starts, workers that never generate insights) does not pay for it.
+        # A thread lock rather than an asyncio.Lock, since the singleton is
+        # shared by every event loop and threadpool worker in the process.
+        self._client = None
+        self._client_ready = False
+        self._client_lock = threading.Lock()
         
-        # Try to initialize OpenAI client with error handling
-        if OPENAI_AVAILABLE and self.api_key:
-            try:
-                self.client = OpenAI(api_key=self.api_key)  # type: ignore
-                self.logger.info(f"OpenAI client initialized with model: {self.model}")
-            except Exception as e:
-                self.logger.warning(f"Failed to initialize OpenAI client: {e}. Using mock insights.")
-                self.client = None
-        else:
-            if not OPENAI_AVAILABLE:
-                self.logger.info("OpenAI library not available. Using mock insights.")
-            elif not self.api_key:
-                self.logger.info("OPENAI_API_KEY not set. Using mock insights.")
+        self._rate_limiter = _RateLimiter(OPENAI_RPM, OPENAI_TPM)
+        self._circuit_breaker = _CircuitBreaker(OPENAI_CIRCUIT_THRESHOLD, OPENAI_CIRCUIT_RESET_SECONDS)
+        
+        # asyncio primitives bind to the loop they are first awaited on
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+    
+    @property
+    def client(self):
+        """OpenAI client, or None when insights should be mocked"""
+        if not self._client_ready:
+            with self._client_lock:
+                if not self._client_ready:
+                    self._client = self._create_client()
+                    self._client_ready = True
+        return self._client
+    
+    @client.setter
+    def client(self, value):
+        with self._client_lock:
+            self._client = value
+            self._client_ready = True
+    
+    def _create_client(self):
+        if not OPENAI_AVAILABLE:
+            logger.info("OpenAI library not available. Using mock insights.")
+            return None
+        if not self.api_key:
+            logger.info("OPENAI_API_KEY not set. Using mock insights.")
+            return None
+        try:
+            # One pooled HTTP client for the process, keeping the SDK's timeouts.
+            # Sized so the pool never queues requests the semaphore let through.
+            http_client = DefaultAsyncHttpxClient(  # type: ignore
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_keepalive_connections=max(20, OPENAI_MAX_CONCURRENT),
+                    max_connections=max(100, OPENAI_MAX_CONCURRENT)
+                )
+            )
+            # Retries are handled in _request_json so they pass through the rate limiter
+            client = AsyncOpenAI(  # type: ignore
+                api_key=self.api_key,
+                http_client=http_client,
+                timeout=httpx.Timeout(OPENAI_TIMEOUT_SECONDS, connect=5.0),
+                max_retries=0
+            )
+            logger.info("OpenAI client initialized with model: %s", self.model)
+            return client
+        except Exception as e:
+            logger.warning("Failed to initialize OpenAI client: %s. Using mock insights.", e)
+            return None
+    
+    async def warm_up(self) -> None:
+        """
+        Open the OpenAI connection (DNS, TCP, TLS) before the first insight
+        request needs it, with a cheap models list call. Failures are only logged.
+        """
+        if not self.client:
+            return
+        try:
+            await self.client.models.list()
+            logger.info("OpenAI connection warmed up")
+        except Exception as e:
+            logger.warning("OpenAI warm-up failed: %s", e)
+    
+    async def aclose(self) -> None:
+        """Close the OpenAI client's connection pool, if one was opened"""
+        with self._client_lock:
+            client, self._client, self._client_ready = self._client, None, False
+        if client is not None:
+            await client.close()
     
     def _extract_json_from_response(self, content: str) -> dict:
         """Extract JSON from OpenAI response, handling markdown code blocks"""
         if not content:
             raise ValueError("Empty content")
         
-        # Try parsing as-is first
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            pass
-        
-        # Try extracting from markdown code block
-        # Common patterns: ```json\n{...}\n``` or ```{...}```
-        import re
+        # json_object mode almost always returns a bare object, so only try
+        # parsing as-is when it looks like one
+        stripped = content.lstrip()
+        if stripped[:1] in ("{", "["):
+            try:
+                return serialization.loads(stripped)
+            except serialization.JSONDecodeError:
+                pass
         
         # Pattern 1: ```json ... ```
-        json_block_pattern = r'```(?:json)?\s*\n?(.*?)\n?```'
-        match = re.search(json_block_pattern, content, re.DOTALL)
+        match = JSON_BLOCK_RE.search(content) if "```" in content else None
         if match:
             json_str = match.group(1).strip()
-            self.logger.debug(f"Extracted JSON from markdown block: {json_str[:100]}...")
-            return json.loads(json_str)
+            logger.debug("Extracted JSON from markdown block: %.100s...", json_str)
+            return serialization.loads(json_str)
         
         # Pattern 2: Just grab content between first { and last }
         first_brace = content.find('{')
         last_brace = content.rfind('}')
         if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
             json_str = content[first_brace:last_brace + 1]
-            self.logger.debug(f"Extracted JSON by finding braces: {json_str[:100]}...")
-            return json.loads(json_str)
+            logger.debug("Extracted JSON by finding braces: %.100s...", json_str)
+            return serialization.loads(json_str)
         
         raise ValueError("Could not extract valid JSON from response")
     
+    def _request_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(OPENAI_MAX_CONCURRENT)
+        return semaphore
+    
+    def _json_format_hint(self, json_format: str) -> str:
+        """Prompt suffix describing the reply shape; the schema carries it under Structured Outputs"""
+        if OPENAI_STRUCTURED_OUTPUTS:
+            return ""
+        return "\n\n" + json_format
+    
+    def _response_format(self, response_schema: dict) -> dict:
+        if OPENAI_STRUCTURED_OUTPUTS:
+            return {"type": "json_schema", "json_schema": response_schema}
+        return {"type": "json_object"}
+    
+    async def _stream_content(
+        self,
+        system_prompt: str,
+        prompt: str,
+        max_tokens: int,
+        response_schema: dict,
+        usage: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Run one streaming chat completion, yielding content deltas as they
+        arrive. If given, usage is filled with the final token counts.
+        """
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            response_format=self._response_format(response_schema),
+            temperature=0.5,
+            max_tokens=max_tokens,
+            # Route same-shaped prompts together so their shared prefix stays cached
+            prompt_cache_key=response_schema["name"],
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            # The final usage chunk carries no choices
+            if usage is not None and getattr(chunk, "usage", None):
+                usage["total_tokens"] = chunk.usage.total_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _estimate_tokens(self, system_prompt: str, prompt: str, max_tokens: int) -> int:
+        # Rough prompt size (~4 characters per token) plus the full completion budget
+        return (len(system_prompt) + len(prompt)) // 4 + max_tokens
+    
+    async def _request_json(
+        self,
+        kind: str,
+        system_prompt: str,
+        prompt: str,
+        max_tokens: int,
+        response_schema: dict
+    ) -> dict:
+        """
+        Run one chat completion and parse its JSON body. With Structured
+        Outputs the body is always a bare object and parses on the first try;
+        the markdown/brace fallbacks only matter in json_object mode.
+        """
+        if not self._circuit_breaker.allow_request():
+            raise CircuitOpenError("OpenAI circuit is open after repeated failures")
+        logger.info("Making OpenAI API request for %s insight using model: %s...", kind, self.model)
+        logger.debug("Prompt: %s", prompt)
+        estimated_tokens = self._estimate_tokens(system_prompt, prompt, max_tokens)
+        for attempt in range(1, OPENAI_MAX_ATTEMPTS + 1):
+            await self._rate_limiter.acquire(estimated_tokens)
+            usage = {}
+            try:
+                async with self._request_semaphore():
+                    content = "".join([
+                        delta async for delta in
+                        self._stream_content(system_prompt, prompt, max_tokens, response_schema, usage)
+                    ])
+                self._circuit_breaker.record_success()
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == OPENAI_MAX_ATTEMPTS:
+                    self._circuit_breaker.record_failure()
+                    raise
+                delay = min(OPENAI_RETRY_BASE_DELAY * 2 ** (attempt - 1), OPENAI_RETRY_MAX_DELAY)
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(
+                    "OpenAI request for %s insight failed (%s), retrying in %.1fs (attempt %d/%d)",
+                    kind, type(e).__name__, delay, attempt, OPENAI_MAX_ATTEMPTS
+                )
+                await asyncio.sleep(delay)
+            except Exception:
+                self._circuit_breaker.record_failure()
+                raise
+            finally:
+                self._rate_limiter.settle(estimated_tokens, usage.get("total_tokens", estimated_tokens))
+        logger.info("Received response from OpenAI API for %s insight.", kind)
+        logger.debug("Response content: %s", content)
+        if not content:
+            raise ValueError("OpenAI response content was empty")
+        try:
+            data = self._extract_json_from_response(content)
+        except (serialization.JSONDecodeError, ValueError):
+            logger.debug("Failed content was: %s", content)
+            raise
+        logger.info("Successfully parsed JSON from OpenAI response.")
+        return data
+    
+    async def _complete_json(
+        self,
+        kind: str,
+        system_prompt: str,
+        prompt: str,
+        max_tokens: int,
+        response_schema: dict
+    ) -> dict:
+        """
+        Memoized _request_json, keyed by a fingerprint of model and prompt.
+        
+        Concurrent identical requests on one event loop share one in-flight
+        call and successful results are reused, from any loop, for
+        INSIGHT_CACHE_TTL_SECONDS; failures are dropped so the next request
+        retries. Misses fall through to the completion_cache table before
+        calling OpenAI.
+        """
+        key = hashlib.blake2b(
+            "\0".join((
+                self.model, system_prompt, prompt, str(max_tokens), str(self._response_format(response_schema))
+            )).encode(),
+            digest_size=16
+        ).hexdigest()
+        entry = self._completion_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            logger.info("Reusing cached OpenAI response for %s insight.", kind)
+            return entry[1]
+        
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._stored_request_json(key, kind, system_prompt, prompt, max_tokens, response_schema)
+            )
+            inflight[key] = task
+            task.add_done_callback(lambda done: self._completion_done(key, inflight, done))
+        else:
+            logger.info("Joining in-flight OpenAI request for %s insight.", kind)
+        
+        return await asyncio.shield(task)
+    
+    def _completion_done(self, key: str, inflight: Dict[str, asyncio.Task], task: asyncio.Task) -> None:
+        """Move a finished completion from the in-flight map into the cache; failures are dropped"""
+        if inflight.get(key) is task:
+            del inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        now = time.monotonic()
+        with self._completion_lock:
+            self._completion_cache[key] = (now + INSIGHT_CACHE_TTL_SECONDS, task.result())
+            self._prune_completion_cache(now)
+    
+    async def _stored_request_json(
+        self,
+        key: str,
+        kind: str,
+        system_prompt: str,
+        prompt: str,
+        max_tokens: int,
+        response_schema: dict
+    ) -> dict:
+        """_request_json behind the completion_cache table"""
+        if INSIGHT_CACHE_DB_TTL_SECONDS <= 0:
+            return await self._request_json(kind, system_prompt, prompt, max_tokens, response_schema)
+        
+        data = await asyncio.to_thread(self._load_stored_response, key)
+        if data is not None:
+            logger.info("Reusing stored OpenAI response for %s insight.", kind)
+            return data
+        
+        data = await self._request_json(kind, system_prompt, prompt, max_tokens, response_schema)
+        await asyncio.to_thread(self._store_response, key, data)
+        return data
+    
+    def _load_stored_response(self, key: str) -> Optional[dict]:
+        # The cache is an optimization: database trouble means a miss, not an error
+        try:
+            with Session(engine) as session:
+                entry = session.get(models.CompletionCacheEntry, key)
+                if entry is None or entry.expires_at <= datetime.utcnow():
+                    return None
+                return serialization.loads(entry.response)
+        except Exception as e:
+            logger.warning("Could not read stored OpenAI response: %s", e)
+            return None
+    
+    def _store_response(self, key: str, data: dict) -> None:
+        try:
+            with Session(engine) as session:
+                now = datetime.utcnow()
+                if time.monotonic() >= self._next_db_prune:
+                    self._next_db_prune = time.monotonic() + INSIGHT_CACHE_DB_PRUNE_SECONDS
+                    session.exec(delete(models.CompletionCacheEntry).where(models.CompletionCacheEntry.expires_at <= now))
+                session.merge(models.CompletionCacheEntry(
+                    key=key,
+                    response=serialization.dumps(data),
+                    expires_at=now + timedelta(seconds=INSIGHT_CACHE_DB_TTL_SECONDS)
+                ))
+                session.commit()
+        except Exception as e:
+            logger.warning("Could not store OpenAI response: %s", e)
+    
+    def _prune_completion_cache(self, now: float) -> None:
+        expired = [k for k, (expires_at, _) in self._completion_cache.items() if expires_at <= now]
+        for k in expired:
+            del self._completion_cache[k]
+        # Oldest first, by insertion order
+        while len(self._completion_cache) > INSIGHT_CACHE_MAX_ENTRIES:
+            del self._completion_cache[next(iter(self._completion_cache))]
+    
+    def _portfolio_prompt(self, portfolio_data: dict) -> str:
+        return (
+            PORTFOLIO_INSTRUCTIONS + self._json_format_hint(PORTFOLIO_JSON_FORMAT)
+            + "\n\nJSON:\n" + serialization.dumps(_compact_for_prompt(portfolio_data))
+        )
+    
+    def _account_prompt(self, account_data: dict) -> str:
+        return (
+            ACCOUNT_INSTRUCTIONS + self._json_format_hint(ACCOUNT_JSON_FORMAT)
+            + "\n\nAccount JSON:\n" + serialization.dumps(account_data)
+        )
+    
+    def _portfolio_insight_from_data(self, data: dict) -> schemas.PortfolioInsight:
+        """Build a PortfolioInsight from a parsed model response"""
+        return schemas.PortfolioInsight.model_validate(
+            {**PORTFOLIO_INSIGHT_DEFAULTS, **data, "generated_at": datetime.now(timezone.utc)}
+        )
+    
+    def _account_payload(
+        self,
+        account: models.Account,
+        risk_factors: List[str],
+        latest_metrics: Optional[models.AccountMetricsDaily]
+    ) -> dict:
+        """
+        Account JSON sent to the model. The health score is rounded to one
+        decimal, as shown in the UI, so recomputes that barely move it still
+        produce the same prompt and hit the completion cache.
+        """
+        account_data = {
+            "name": account.name,
+            "segment": account.segment.value if account.segment else "Unknown",
+            "region": account.region,
+            "arr": float(account.arr) if account.arr else 0.0,
+            "health_score": round(float(account.health_score), 1) if account.health_score else 0.0,
+            "health_bucket": account.health_bucket.value if account.health_bucket else "Unknown",
+            "risk_factors": risk_factors or [],
+        }
+        if latest_metrics:
+            account_data["metrics"] = {
+                "logins": latest_metrics.logins,
+                "events": latest_metrics.events,
+                "feature_x_events": latest_metrics.feature_x_events,
+                "avg_session_min": latest_metrics.avg_session_min,
+                "errors": latest_metrics.errors,
+                "ticket_backlog": latest_metrics.ticket_backlog
+            }
+        return _compact_for_prompt(account_data)
+    
+    def _account_insight_from_data(
+        self,
+        account: models.Account,
+        risk_factors: List[str],
+        data: dict
+    ) -> schemas.AccountInsight:
+        """Build an AccountInsight from one parsed model response"""
+        # Plain dicts are validated in the same pass as the insight
+        actions = [
+            {key: action.get(key, default) for key, default in ACCOUNT_ACTION_DEFAULTS.items()}
+            for action in data.get("recommended_actions", [])[:3]
+        ]
+        return schemas.AccountInsight.model_validate({
+            "account_id": account.id or 0,
+            "account_name": account.name,
+            "summary": data.get("summary", ""),
+            "health_analysis": data.get("health_analysis", ""),
+            "risk_factors": risk_factors,
+            "recommended_actions": actions,
+            "generated_at": datetime.now(timezone.utc)
+        })
+    
     def _generate_mock_portfolio_insight(self, portfolio_data: dict) -> schemas.PortfolioInsight:
         """Generate mock portfolio insight when AI is not available"""
         total_arr = portfolio_data.get("total_arr", 0)
@@ -85,7 +806,8 @@ class AIInsightsService:
         amber_pct = risk_breakdown.get('Amber', 0)
         red_pct = risk_breakdown.get('Red', 0)
         
-        return schemas.PortfolioInsight(
+        # Every field is built here with the right type, so skip validation
+        return schemas.PortfolioInsight.model_construct(
             summary=f"Portfolio of {portfolio_data.get('total_accounts', 0)} accounts with total ARR of ${total_arr:,.2f}. "
                    f"Health distribution: {green_pct}% Green (Healthy), "
                    f"{amber_pct}% Amber (At-Risk), {red_pct}% Red (Critical).",
@@ -104,7 +826,7 @@ class AIInsightsService:
                 "Implement proactive outreach program",
                 "Increase feature adoption through training"
             ],
-            generated_at=datetime.utcnow()
+            generated_at=datetime.now(timezone.utc)
         )
     
     def _generate_mock_account_insight(
@@ -114,40 +836,14 @@ class AIInsightsService:
         latest_metrics: Optional[models.AccountMetricsDaily]
     ) -> schemas.AccountInsight:
         """Generate mock account insight when AI is not available"""
-        actions = []
-        
-        if "Low user engagement" in risk_factors:
-            actions.append(schemas.AccountAction(
-                title="Schedule Executive Business Review",
-                description="Conduct a strategic review to understand usage barriers and align on value realization",
-                priority="High",
-                estimated_impact="Could increase engagement by 40-50%"
-            ))
-        
-        if "High support ticket volume" in risk_factors:
-            actions.append(schemas.AccountAction(
-                title="Provide Technical Training",
-                description="Organize training sessions to reduce support dependency",
-                priority="High",
-                estimated_impact="Could reduce tickets by 60%"
-            ))
-        
-        if "Low feature adoption" in risk_factors:
-            actions.append(schemas.AccountAction(
-                title="Feature Adoption Workshop",
-                description="Guide users through underutilized features that match their use case",
-                priority="Medium",
-                estimated_impact="Could increase adoption by 30%"
-            ))
+        actions = [
+            action.model_copy()
+            for risk_factor, action in MOCK_ACTION_TEMPLATES
+            if risk_factor in risk_factors
+        ]
         
-        # Ensure we always have 3 actions
-        while len(actions) < 3:
-            actions.append(schemas.AccountAction(
-                title="Regular Check-in Call",
-                description="Schedule monthly success check-ins to monitor progress",
-                priority="Medium",
-                estimated_impact="Improves relationship and early warning signals"
-            ))
+        # Ensure we always have 3 actions (there are only 3 templates)
+        actions.extend(MOCK_DEFAULT_ACTION.model_copy() for _ in range(3 - len(actions)))
         
         bucket_str = account.health_bucket.value if account.health_bucket else "Unknown"
         health_score = account.health_score or 0.0
@@ -160,74 +856,123 @@ class AIInsightsService:
             f"Key concerns: {', '.join(risk_factors) if risk_factors else 'None identified'}"
         ]
         
-        return schemas.AccountInsight(
+        # Every field is built here with the right type, so skip validation
+        return schemas.AccountInsight.model_construct(
             account_id=account.id or 0,
             account_name=account.name,
             summary=f"{account.name} ({account.segment.value if account.segment else 'Unknown'}) is in {bucket_str} state with "
                    f"a health score of {health_score:.1f}. ARR: ${arr:,.2f}.",
             health_analysis=health_insights,
-            risk_factors=risk_factors,
-            recommended_actions=actions[:3],
-            generated_at=datetime.utcnow()
+            risk_factors=list(risk_factors),
+            recommended_actions=actions,
+            generated_at=datetime.now(timezone.utc)
         )
     
     async def generate_portfolio_insight(self, portfolio_data: dict) -> schemas.PortfolioInsight:
         """Generate AI-powered portfolio insights"""
         if not self.client:
-            self.logger.info("Using mock portfolio insight (no OpenAI client available)")
+            logger.info("Using mock portfolio insight (no OpenAI client available)")
             return self._generate_mock_portfolio_insight(portfolio_data)
         try:
-            # Convert portfolio data to clean JSON
-            portfolio_json = json.dumps(portfolio_data, indent=2, default=str)
-            prompt = f"""You are a Customer Success leader. Using the JSON portfolio snapshot, write:
-1) A 120–160 word executive summary for the VP CS.
-2) 3 priority actions for the next 30 days.
-3) A one-line \"what changed this week\" note.
-
-Keep it concise, factual, and free of hallucinations. If data is missing, say so.
-
-JSON:
-{portfolio_json}
-
-IMPORTANT: Return ONLY valid JSON without any markdown formatting, code blocks, or explanatory text. Use this exact structure:
-{{"summary": "string", "key_findings": ["action1", "action2", "action3"], "top_risks": ["what changed note"], "opportunities": []}}"""
-            self.logger.info(f"Making OpenAI API request for portfolio insight using model: {self.model}...")
-            self.logger.debug(f"Prompt: {prompt}")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a Customer Success leader preparing executive insights. Be concise and factual. Always respond with valid JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.5,
-                max_tokens=600
-            )
-            content = response.choices[0].message.content
-            self.logger.info("Received response from OpenAI API for portfolio insight.")
-            self.logger.debug(f"Response content: {content}")
-            # Try to parse JSON from response
-            if not content:
-                self.logger.warning("OpenAI response content was None. Falling back to mock insight.")
-                return self._generate_mock_portfolio_insight(portfolio_data)
+            prompt = self._portfolio_prompt(portfolio_data)
             try:
-                data = self._extract_json_from_response(content)
-                self.logger.info("Successfully parsed JSON from OpenAI response.")
-            except (json.JSONDecodeError, ValueError) as e:
-                self.logger.warning(f"OpenAI response was not valid JSON: {e}. Falling back to mock insight.")
-                self.logger.debug(f"Failed content was: {content}")
+                data = await self._complete_json(
+                    "portfolio", PORTFOLIO_SYSTEM_PROMPT, prompt, 600, PORTFOLIO_RESPONSE_SCHEMA
+                )
+            except (serialization.JSONDecodeError, ValueError) as e:
+                logger.warning("OpenAI response was not valid JSON: %s. Falling back to mock insight.", e)
                 return self._generate_mock_portfolio_insight(portfolio_data)
-            return schemas.PortfolioInsight(
-                summary=data.get("summary", ""),
-                key_findings=data.get("key_findings", []),
-                top_risks=data.get("top_risks", []),
-                opportunities=data.get("opportunities", []),
-                generated_at=datetime.utcnow()
-            )
+            return self._portfolio_insight_from_data(data)
         except Exception as e:
-            self.logger.error(f"AI generation error: {e}")
+            logger.error("AI generation error: %s", e)
             return self._generate_mock_portfolio_insight(portfolio_data)
     
+    async def generate_portfolio_insight_stream(
+        self,
+        portfolio_data: dict
+    ) -> AsyncIterator[Tuple[str, Union[str, schemas.PortfolioInsight]]]:
+        """
+        Generate portfolio insights while streaming the completion. Yields
+        ("delta", text) as the model writes, then one ("insight", PortfolioInsight),
+        which is the mock insight if no client is set up or the reply is unusable.
+        Not cached and not retried, since deltas may already have been sent.
+        """
+        async for event in self._stream_insight(
+            "portfolio",
+            PORTFOLIO_SYSTEM_PROMPT,
+            lambda: self._portfolio_prompt(portfolio_data),
+            600,
+            PORTFOLIO_RESPONSE_SCHEMA,
+            self._portfolio_insight_from_data,
+            lambda: self._generate_mock_portfolio_insight(portfolio_data)
+        ):
+            yield event
+    
+    async def generate_account_insight_stream(
+        self,
+        account: models.Account,
+        risk_factors: List[str],
+        latest_metrics: Optional[models.AccountMetricsDaily]
+    ) -> AsyncIterator[Tuple[str, Union[str, schemas.AccountInsight]]]:
+        """
+        generate_portfolio_insight_stream() for one account: ("delta", text)
+        events, then one ("insight", AccountInsight).
+        """
+        async for event in self._stream_insight(
+            "account",
+            ACCOUNT_SYSTEM_PROMPT,
+            lambda: self._account_prompt(self._account_payload(account, risk_factors, latest_metrics)),
+            800,
+            ACCOUNT_RESPONSE_SCHEMA,
+            lambda data: self._account_insight_from_data(account, risk_factors, data),
+            lambda: self._generate_mock_account_insight(account, risk_factors, latest_metrics)
+        ):
+            yield event
+    
+    async def _stream_insight(
+        self,
+        kind: str,
+        system_prompt: str,
+        build_prompt: Callable[[], str],
+        max_tokens: int,
+        response_schema: dict,
+        from_data: Callable[[dict], BaseModel],
+        mock: Callable[[], BaseModel]
+    ) -> AsyncIterator[Tuple[str, Union[str, BaseModel]]]:
+        if not self.client:
+            logger.info("Using mock %s insight (no OpenAI client available)", kind)
+            yield "insight", mock()
+            return
+        
+        if not self._circuit_breaker.allow_request():
+            logger.info("Using mock %s insight (OpenAI circuit is open)", kind)
+            yield "insight", mock()
+            return
+        
+        prompt = build_prompt()
+        estimated_tokens = self._estimate_tokens(system_prompt, prompt, max_tokens)
+        await self._rate_limiter.acquire(estimated_tokens)
+        usage = {}
+        parts = []
+        streamed = False
+        try:
+            logger.info("Streaming OpenAI API request for %s insight using model: %s...", kind, self.model)
+            async with self._request_semaphore():
+                async for delta in self._stream_content(system_prompt, prompt, max_tokens, response_schema, usage):
+                    parts.append(delta)
+                    yield "delta", delta
+            streamed = True
+            self._circuit_breaker.record_success()
+            insight = from_data(self._extract_json_from_response("".join(parts)))
+        except Exception as e:
+            if not streamed:
+                self._circuit_breaker.record_failure()
+            logger.error("AI generation error: %s", e)
+            insight = mock()
+        finally:
+            self._rate_limiter.settle(estimated_tokens, usage.get("total_tokens", estimated_tokens))
+        yield "insight", insight
+    
     async def generate_account_insight(
         self,
         account: models.Account,
@@ -237,94 +982,116 @@ IMPORTANT: Return ONLY valid JSON without any markdown formatting, code blocks,
     ) -> schemas.AccountInsight:
         """Generate AI-powered account insights and recommendations"""
         if not self.client:
-            self.logger.info("Using mock account insight (no OpenAI client available)")
+            logger.info("Using mock account insight (no OpenAI client available)")
             return self._generate_mock_account_insight(account, risk_factors, latest_metrics)
         try:
-            # Build comprehensive account JSON
-            account_data = {
-                "name": account.name,
-                "segment": account.segment.value if account.segment else "Unknown",
-                "region": account.region,
-                "arr": float(account.arr) if account.arr else 0.0,
-                "health_score": float(account.health_score) if account.health_score else 0.0,
-                "health_bucket": account.health_bucket.value if account.health_bucket else "Unknown",
-                "risk_factors": risk_factors or [],
-            }
-            if latest_metrics:
-                account_data["metrics"] = {
-                    "logins": latest_metrics.logins,
-                    "events": latest_metrics.events,
-                    "feature_x_events": latest_metrics.feature_x_events,
-                    "avg_session_min": latest_metrics.avg_session_min,
-                    "errors": latest_metrics.errors,
-                    "ticket_backlog": latest_metrics.ticket_backlog
-                }
-            # Get available playbooks
-            available_playbooks = playbooks.PLAYBOOKS_LIBRARY
-            playbooks_list = "\n".join([f"- {p['title']}: {p['description']}" for p in available_playbooks])
-            account_json = json.dumps(account_data, indent=2, default=str)
-            prompt = f"""You are a CSM preparing an account review. Given this account JSON with health score, top factors, tickets, NPS, and ARR, produce:
-- 3 bullet insights (facts, not guesses).
-- 3 recommended plays from the provided playbook list.
-- A 1-sentence executive note.
-
-Keep it concise and factual. If data is missing, say so.
-
-Account JSON:
-{account_json}
-
-Available Playbooks:
-{playbooks_list}
-
-IMPORTANT: Return ONLY valid JSON without any markdown formatting, code blocks, or explanatory text. Use this exact structure:
-{{"summary": "executive note", "health_analysis": ["insight1", "insight2", "insight3"], "recommended_actions": [{{"title": "playbook name", "description": "why", "priority": "High/Medium/Low", "estimated_impact": "impact"}}]}}"""
-            self.logger.info(f"Making OpenAI API request for account insight using model: {self.model}...")
-            self.logger.debug(f"Prompt: {prompt}")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a CSM preparing an account review. Be concise and fact-based. Always respond with valid JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.5,
-                max_tokens=800
-            )
-            content = response.choices[0].message.content
-            self.logger.info("Received response from OpenAI API for account insight.")
-            self.logger.debug(f"Response content: {content}")
-            if not content:
-                self.logger.warning("OpenAI response content was None. Falling back to mock insight.")
-                return self._generate_mock_account_insight(account, risk_factors, latest_metrics)
+            account_data = self._account_payload(account, risk_factors, latest_metrics)
+            prompt = self._account_prompt(account_data)
             try:
-                data = self._extract_json_from_response(content)
-                self.logger.info("Successfully parsed JSON from OpenAI response.")
-            except (json.JSONDecodeError, ValueError) as e:
-                self.logger.warning(f"OpenAI response was not valid JSON: {e}. Falling back to mock insight.")
-                self.logger.debug(f"Failed content was: {content}")
-                return self._generate_mock_account_insight(account, risk_factors, latest_metrics)
-            actions = [
-                schemas.AccountAction(
-                    title=action.get("title", ""),
-                    description=action.get("description", ""),
-                    priority=action.get("priority", "Medium"),
-                    estimated_impact=action.get("estimated_impact", "")
+                data = await self._complete_json(
+                    "account", ACCOUNT_SYSTEM_PROMPT, prompt, 800, ACCOUNT_RESPONSE_SCHEMA
                 )
-                for action in data.get("recommended_actions", [])[:3]
-            ]
-            return schemas.AccountInsight(
-                account_id=account.id or 0,
-                account_name=account.name,
-                summary=data.get("summary", ""),
-                health_analysis=data.get("health_analysis", ""),
-                risk_factors=risk_factors,
-                recommended_actions=actions,
-                generated_at=datetime.utcnow()
-            )
+            except (serialization.JSONDecodeError, ValueError) as e:
+                logger.warning("OpenAI response was not valid JSON: %s. Falling back to mock insight.", e)
+                return self._generate_mock_account_insight(account, risk_factors, latest_metrics)
+            return self._account_insight_from_data(account, risk_factors, data)
         except Exception as e:
-            self.logger.error(f"AI generation error: {e}")
+            logger.error("AI generation error: %s", e)
             return self._generate_mock_account_insight(account, risk_factors, latest_metrics)
+    
+    async def generate_account_insights_batch(
+        self,
+        items: Sequence[Tuple[models.Account, List[str], Optional[models.AccountMetricsDaily]]]
+    ) -> List[schemas.AccountInsight]:
+        """
+        Generate insights for many accounts, packing up to ACCOUNT_BATCH_MAX_SIZE
+        accounts into each OpenAI request. Results are returned in input order;
+        any account the model leaves out falls back to its mock insight.
+        """
+        if not self.client:
+            logger.info("Using mock account insights (no OpenAI client available)")
+            return [self._generate_mock_account_insight(*item) for item in items]
+        
+        semaphore = asyncio.Semaphore(ACCOUNT_BATCH_CONCURRENCY)
+        
+        async def run_batch(batch):
+            async with semaphore:
+                return await self._generate_account_batch(batch)
+        
+        batches = [
+            items[i:i + ACCOUNT_BATCH_MAX_SIZE]
+            for i in range(0, len(items), ACCOUNT_BATCH_MAX_SIZE)
+        ]
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return [insight for batch_insights in results for insight in batch_insights]
+    
+    async def generate_account_insights_bulk(
+        self,
+        items: Sequence[Tuple[models.Account, List[str], Optional[models.AccountMetricsDaily]]]
+    ) -> List[schemas.AccountInsight]:
+        """
+        Generate insights for many accounts with one request per account, all
+        in flight together (bounded by OPENAI_MAX_CONCURRENT). Unlike the
+        batched form, each account shares the single-account completion cache.
+        """
+        results = await asyncio.gather(
+            *(self.generate_account_insight(account, risk_factors, latest_metrics)
+              for account, risk_factors, latest_metrics in items),
+            return_exceptions=True
+        )
+        insights = []
+        for item, result in zip(items, results):
+            if isinstance(result, BaseException):
+                logger.error("AI generation error for account %s: %s", item[0].id, result)
+                result = self._generate_mock_account_insight(*item)
+            insights.append(result)
+        return insights
+    
+    async def _generate_account_batch(
+        self,
+        batch: Sequence[Tuple[models.Account, List[str], Optional[models.AccountMetricsDaily]]]
+    ) -> List[schemas.AccountInsight]:
+        try:
+            accounts_data = []
+            for account, risk_factors, latest_metrics in batch:
+                account_data = {"account_id": account.id}
+                account_data.update(self._account_payload(account, risk_factors, latest_metrics))
+                accounts_data.append(account_data)
+            prompt = (
+                ACCOUNT_BATCH_INSTRUCTIONS + self._json_format_hint(ACCOUNT_BATCH_JSON_FORMAT)
+                + "\n\nAccounts JSON:\n" + serialization.dumps(accounts_data)
+            )
+            max_tokens = min(800 * len(batch), ACCOUNT_BATCH_MAX_TOKENS)
+            data = await self._complete_json(
+                "account batch", ACCOUNT_SYSTEM_PROMPT, prompt, max_tokens, ACCOUNT_BATCH_RESPONSE_SCHEMA
+            )
+            
+            by_id = {}
+            for entry in data.get("insights", []):
+                if isinstance(entry, dict) and "account_id" in entry:
+                    try:
+                        by_id[int(entry["account_id"])] = entry
+                    except (TypeError, ValueError):
+                        continue
+        except Exception as e:
+            logger.error("AI batch generation error: %s", e)
+            by_id = {}
+        
+        insights = []
+        for account, risk_factors, latest_metrics in batch:
+            entry = by_id.get(account.id)
+            if entry is None:
+                insights.append(self._generate_mock_account_insight(account, risk_factors, latest_metrics))
+                continue
+            try:
+                insights.append(self._account_insight_from_data(account, risk_factors, entry))
+            except Exception as e:
+                logger.error("AI generation error for account %s: %s", account.id, e)
+                insights.append(self._generate_mock_account_insight(account, risk_factors, latest_metrics))
+        return insights
 
 
-# Singleton instance
-ai_service = AIInsightsService()
+@lru_cache(maxsize=1)
+def get_ai_service() -> AIInsightsService:
+    """Shared service instance, created on first use (FastAPI dependency)"""
+    return AIInsightsService()
@@ -1,29 +1,92 @@
 from sqlmodel import create_engine, SQLModel, Session
-from sqlalchemy.pool import StaticPool, NullPool
+from sqlalchemy import delete, event, func, inspect, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool, NullPool, QueuePool
 from dotenv import load_dotenv
+import logging
 import os
 
+from . import serialization
+
+logger = logging.getLogger(__name__)
+
 # Load environment variables FIRST (before reading DATABASE_URL)
 load_dotenv()
 
 # Database URL from environment
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ai_success_insights.db")
 
+# Batched executemany settings per DBAPI driver, so bulk ingest sends
+# multi-row statements instead of one prepared execution per row.
+# SQLite needs nothing: insertmanyvalues is on by default.
+EXECUTEMANY_OPTIONS = {
+    # psycopg2: INSERTs use multi-row VALUES, UPDATEs go through execute_batch
+    "psycopg2": {
+        "executemany_mode": "values_plus_batch",
+        "insertmanyvalues_page_size": 1000,
+        "executemany_batch_page_size": 500,
+    },
+    # pyodbc (SQL Server): bind arrays instead of sp_execute per row
+    "pyodbc": {"fast_executemany": True},
+}
+_executemany_options = EXECUTEMANY_OPTIONS.get(make_url(DATABASE_URL).get_driver_name(), {})
+
+# Per-connection settings for file-backed SQLite: WAL lets reads run during
+# ingest writes and, with synchronous=NORMAL, fsyncs at checkpoints instead
+# of on every commit; temp B-trees stay in memory and reads go through mmap.
+SQLITE_PRAGMAS = [
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-65536",  # KiB, i.e. 64 MiB
+    "mmap_size=268435456",
+]
+
+# JSON columns (snapshot factors) encode and decode through orjson when installed
+_json_options = {"json_serializer": serialization.dumps, "json_deserializer": serialization.loads}
+
 # Create engine with Lambda-friendly configuration
 if DATABASE_URL.startswith("sqlite"):
-    # SQLite for local development
+    # SQLite for local development. DB-bound endpoints run in FastAPI's
+    # threadpool, so file databases get a connection per thread from the
+    # default pool; only in-memory databases must share one connection.
+    _in_memory = make_url(DATABASE_URL).database in (None, "", ":memory:")
     engine = create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-        echo=False  # Set to True for SQL debugging
+        poolclass=StaticPool if _in_memory else None,
+        echo=False,  # Set to True for SQL debugging
+        **_json_options,
     )
+    
+    if not _in_memory:
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in SQLITE_PRAGMAS:
+                cursor.execute(f"PRAGMA {pragma}")
+            cursor.close()
 elif DATABASE_URL.startswith("postgresql"):
     # PostgreSQL for production (Neon, AWS RDS, etc.)
-    # NullPool is Lambda-friendly - creates new connections per invocation
+    if os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+        # A container serves one invocation at a time, so keep one connection
+        # for warm invocations instead of a new TCP+TLS handshake each time.
+        # Overflow covers the second session opened alongside a request's
+        # (e.g. the completion cache); pre-ping replaces connections the
+        # server dropped while the container was frozen.
+        _pool_options = {
+            "poolclass": QueuePool,
+            "pool_size": 1,
+            "max_overflow": 2,
+            "pool_pre_ping": True,
+            "pool_recycle": 300,
+        }
+    else:
+        # NullPool - creates new connections per request
+        _pool_options = {"poolclass": NullPool}
     engine = create_engine(
         DATABASE_URL,
-        poolclass=NullPool,  # No connection pooling for Lambda
         echo=False,
         connect_args={
             "connect_timeout": 10,
@@ -31,16 +94,70 @@ elif DATABASE_URL.startswith("postgresql"):
             "keepalives_idle": 30,
             "keepalives_interval": 10,
             "keepalives_count": 5,
-        }
+        },
+        **_pool_options,
+        **_executemany_options,
+        **_json_options,
     )
 else:
     # Fallback for other databases
-    engine = create_engine(DATABASE_URL, echo=False)
+    engine = create_engine(DATABASE_URL, echo=False, **_executemany_options, **_json_options)
+
+
+def _migrate_top_factors_to_jsonb():
+    """
+    health_snapshots.top_factors used to be JSON stored as text; on Postgres
+    convert an existing column to JSONB in place (a no-op once converted).
+    SQLite reads the old text rows as JSON as they are.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        data_type = conn.execute(text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'health_snapshots' AND column_name = 'top_factors'"
+        )).scalar()
+        if data_type and data_type != "jsonb":
+            logger.info("Converting health_snapshots.top_factors to jsonb")
+            conn.execute(text(
+                "ALTER TABLE health_snapshots "
+                "ALTER COLUMN top_factors TYPE jsonb USING top_factors::jsonb"
+            ))
+
+
+def _dedupe_daily_metrics():
+    """
+    Databases created before ix_metrics_account_date may hold several rows
+    for one account and day; keep the first of each so the unique index
+    (which ingest's ON CONFLICT relies on) can be built.
+    """
+    from .models import AccountMetricsDaily as Metrics
+    
+    existing = {ix["name"] for ix in inspect(engine).get_indexes(Metrics.__tablename__)}
+    if "ix_metrics_account_date" in existing:
+        return
+    with engine.begin() as conn:
+        first_ids = select(func.min(Metrics.id)).group_by(Metrics.account_id, Metrics.date)
+        removed = conn.execute(delete(Metrics).where(Metrics.id.not_in(first_ids))).rowcount
+    if removed:
+        logger.info("Removed %s duplicate daily metric rows", removed)
 
 
 def init_db():
-    """Initialize database tables"""
+    """Initialize database tables and any indexes added since they were created"""
     SQLModel.metadata.create_all(engine)
+    _migrate_top_factors_to_jsonb()
+    _dedupe_daily_metrics()
+    
+    # create_all skips tables that already exist, so their newer indexes are
+    # created here; checkfirst makes this a no-op once they are in place
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(engine, checkfirst=True)
+            except IntegrityError:
+                logger.error("Could not create unique index %s", index.name)
+                raise
 
 
 def get_db():
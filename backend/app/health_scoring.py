@@ -10,9 +10,11 @@ Normalization ranges aligned with industry standards:
 - SLA Breaches (90d): 0-3
 - Days Since QBR: 0-120
 """
-from typing import List, Dict, Tuple
+from typing import List, Mapping, Optional, Sequence, Tuple
 from datetime import datetime, date
-import json
+
+import numpy as np
+from sqlalchemy import case, insert, literal, update
 
 from . import models
 
@@ -26,27 +28,53 @@ CRITICAL_TICKETS_MAX = 5
 SLA_BREACHES_MAX = 3
 QBR_DAYS_MAX = 120
 
+# Health bucket thresholds: Green (>=75), Amber (50-74), Red (<50)
+GREEN_MIN_SCORE = 75
+AMBER_MIN_SCORE = 50
+
 
-class HealthFactor:
-    """Represents a single factor contributing to health score"""
-    def __init__(self, factor: str, impact: float):
-        self.factor = factor
-        self.impact = round(impact, 1)
-    
-    def to_dict(self) -> dict:
-        return {"factor": self.factor, "impact": self.impact}
+# Account columns read by the scoring engine
+SCORING_COLUMNS = (
+    "active_users", "seats_purchased", "feature_x_adoption", "weekly_active_pct",
+    "time_to_value_days", "tickets_last_30d", "critical_tickets_90d", "sla_breaches_90d",
+    "nps", "qbr_last_date", "onboarding_phase", "expansion_oppty_dollar", "arr",
+    "renewal_date",
+)
 
+# Explainable factors, in the order they are evaluated.
+# Column i of the impact matrix holds FACTOR_NAMES[i] (NaN = not triggered).
+FACTOR_NAMES = (
+    "Strong user adoption",
+    "Low user adoption",
+    "Moderate user adoption",
+    "High feature adoption",
+    "Low feature adoption",
+    "Low weekly engagement",
+    "Fast time to value",
+    "Slow time to value",
+    "High ticket volume",
+    "Zero support tickets",
+    "Multiple critical issues",
+    "SLA breaches",
+    "Promoter NPS",
+    "Detractor NPS",
+    "Overdue QBR",
+    "No QBR history",
+    "Extended onboarding",
+    "Strong expansion opportunity",
+    "Renewal risk: low adoption",
+)
 
-def normalize(value: float, min_val: float, max_val: float, inverse: bool = False) -> float:
+
+def normalize(value, min_val: float, max_val: float, inverse: bool = False):
     """
-    Normalize value to 0-1 range.
+    Normalize value (scalar or array) to 0-1 range.
     If inverse=True, higher input values result in lower scores.
     """
     if max_val == min_val:
-        return 0.5
+        return np.full_like(value, 0.5, dtype=np.float64)
     
-    normalized = (value - min_val) / (max_val - min_val)
-    normalized = max(0.0, min(1.0, normalized))
+    normalized = np.clip((value - min_val) / (max_val - min_val), 0.0, 1.0)
     
     if inverse:
         normalized = 1.0 - normalized
@@ -54,12 +82,27 @@ def normalize(value: float, min_val: float, max_val: float, inverse: bool = Fals
     return normalized
 
 
-def calculate_health_score(account: models.Account) -> Tuple[float, List[HealthFactor], str]:
+def _days_between(start, end) -> np.ndarray:
+    """Whole days from start to end; NaN where either date is missing."""
+    start = np.asarray(start, dtype="datetime64[D]")
+    end = np.asarray(end, dtype="datetime64[D]")
+    days = (end - start).astype(np.float64)
+    days[np.isnat(start) | np.isnat(end)] = np.nan
+    return days
+
+
+def calculate_health_scores_vec(columns: Mapping) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    Calculate health score with explainable factors.
+    Vectorized health scoring over many accounts at once.
+    
+    Args:
+        columns: mapping of SCORING_COLUMNS to equal-length array-likes
+            (a DataFrame or a dict of column lists).
     
     Returns:
-        (score, top_factors, risk_label)
+        (scores, risk_labels, impacts) where impacts is an
+        (n_accounts, len(FACTOR_NAMES)) matrix, NaN where a factor
+        did not fire.
     
     Scoring breakdown:
     - Adoption (35%): adoption_ratio (20%), feature_x (10%), weekly_active (5%)
@@ -69,42 +112,58 @@ def calculate_health_score(account: models.Account) -> Tuple[float, List[HealthF
     - CS Process (10%): qbr_recency (5%), onboarding (5%)
     - Commercial Bonus: ±10 points
     """
-    factors: List[HealthFactor] = []
-    base_score = 0.0
+    def col(name):
+        return np.asarray(columns[name], dtype=np.float64)
+    
+    active_users = col("active_users")
+    seats_purchased = col("seats_purchased")
+    feature_x_adoption = col("feature_x_adoption")
+    weekly_active_pct = col("weekly_active_pct")
+    ttv = col("time_to_value_days")
+    tickets = col("tickets_last_30d")
+    critical = col("critical_tickets_90d")
+    sla = col("sla_breaches_90d")
+    nps = col("nps")
+    onboarding = np.asarray(columns["onboarding_phase"], dtype=bool)
+    expansion = col("expansion_oppty_dollar")
+    arr = col("arr")
+    
+    today = date.today()
+    days_since_qbr = _days_between(columns["qbr_last_date"], np.full(len(arr), today))
+    days_to_renewal = _days_between(np.full(len(arr), today), columns["renewal_date"])
+    
+    n = len(arr)
+    impacts = np.full((n, len(FACTOR_NAMES)), np.nan)
+    
+    def factor(name, mask, impact):
+        i = FACTOR_NAMES.index(name)
+        impacts[:, i] = np.where(mask, impact, np.nan)
     
     # ========================================
     # ADOPTION (35 points total)
     # ========================================
     
     # 1. Adoption Ratio: active_users / seats_purchased (20 points)
-    adoption_ratio = account.active_users / max(1, account.seats_purchased)
-    adoption_ratio = min(1.2, adoption_ratio)  # Cap at 1.2
-    adoption_ratio_normalized = min(1.0, adoption_ratio / 1.2)  # Normalize to 0-1
-    adoption_ratio_score = adoption_ratio_normalized * 20
-    base_score += adoption_ratio_score
-    
-    if adoption_ratio >= 0.9:
-        factors.append(HealthFactor("Strong user adoption", adoption_ratio_score))
-    elif adoption_ratio < 0.3:
-        factors.append(HealthFactor("Low user adoption", adoption_ratio_score - 20))
-    else:
-        factors.append(HealthFactor("Moderate user adoption", adoption_ratio_score - 10))
+    adoption_ratio = np.minimum(1.2, active_users / np.maximum(1, seats_purchased))  # Cap at 1.2
+    adoption_ratio_score = np.minimum(1.0, adoption_ratio / 1.2) * 20  # Normalize to 0-1
+    base_score = adoption_ratio_score
     
-    # 2. Feature X Adoption (10 points)
-    feature_x_score = account.feature_x_adoption * 10
-    base_score += feature_x_score
+    strong = adoption_ratio >= 0.9
+    low = adoption_ratio < 0.3
+    factor("Strong user adoption", strong, adoption_ratio_score)
+    factor("Low user adoption", low, adoption_ratio_score - 20)
+    factor("Moderate user adoption", ~strong & ~low, adoption_ratio_score - 10)
     
-    if account.feature_x_adoption >= 0.7:
-        factors.append(HealthFactor("High feature adoption", feature_x_score))
-    elif account.feature_x_adoption < 0.3:
-        factors.append(HealthFactor("Low feature adoption", feature_x_score - 10))
+    # 2. Feature X Adoption (10 points)
+    feature_x_score = feature_x_adoption * 10
+    base_score = base_score + feature_x_score
+    factor("High feature adoption", feature_x_adoption >= 0.7, feature_x_score)
+    factor("Low feature adoption", feature_x_adoption < 0.3, feature_x_score - 10)
     
     # 3. Weekly Active % (5 points)
-    weekly_active_score = account.weekly_active_pct * 5
-    base_score += weekly_active_score
-    
-    if account.weekly_active_pct < 0.3:
-        factors.append(HealthFactor("Low weekly engagement", weekly_active_score - 5))
+    weekly_active_score = weekly_active_pct * 5
+    base_score = base_score + weekly_active_score
+    factor("Low weekly engagement", weekly_active_pct < 0.3, weekly_active_score - 5)
     
     # ========================================
     # ENGAGEMENT & VALUE (20 points total)
@@ -112,224 +171,225 @@ def calculate_health_score(account: models.Account) -> Tuple[float, List[HealthF
     
     # 4. Average Session Time (10 points)
     # Range: 5-40 minutes (aligned with industry standards)
-    # For now, use a placeholder - in real implementation would query latest metrics
     # Use active_users as proxy: assume 1 active user ≈ 15 min session baseline
-    estimated_session_min = account.active_users * 0.5 + 15  # Rough estimate
-    avg_session_normalized = normalize(
-        estimated_session_min,
-        min_val=AVG_SESSION_MIN, 
-        max_val=AVG_SESSION_MAX, 
-        inverse=False
-    )
-    avg_session_score = avg_session_normalized * 10
-    base_score += avg_session_score
+    estimated_session_min = active_users * 0.5 + 15  # Rough estimate
+    avg_session_score = normalize(estimated_session_min, AVG_SESSION_MIN, AVG_SESSION_MAX) * 10
+    base_score = base_score + avg_session_score
     
-    # 5. Time to Value (10 points - inverse)
+    # 5. Time to Value (10 points - inverse), neutral 5 when unknown
     # Range: 7-90 days (aligned with industry standards)
-    if account.time_to_value_days is not None:
-        # Faster time to value is better
-        ttv_normalized = normalize(
-            account.time_to_value_days,
-            min_val=TIME_TO_VALUE_MIN, 
-            max_val=TIME_TO_VALUE_MAX, 
-            inverse=True
-        )
-        ttv_score = ttv_normalized * 10
-        base_score += ttv_score
-        
-        if account.time_to_value_days <= 30:
-            factors.append(HealthFactor("Fast time to value", ttv_score))
-        elif account.time_to_value_days > 60:
-            factors.append(HealthFactor("Slow time to value", ttv_score - 10))
-    else:
-        # No data, assume neutral
-        base_score += 5
+    has_ttv = ~np.isnan(ttv)
+    ttv_score = normalize(ttv, TIME_TO_VALUE_MIN, TIME_TO_VALUE_MAX, inverse=True) * 10
+    base_score = base_score + np.where(has_ttv, ttv_score, 5)
+    factor("Fast time to value", has_ttv & (ttv <= 30), ttv_score)
+    factor("Slow time to value", has_ttv & (ttv > 60), ttv_score - 10)
     
     # ========================================
     # SUPPORT LOAD & RELIABILITY (20 points total)
     # ========================================
     
     # 6. Tickets Last 30d (8 points - inverse)
-    # Range: 0-30 tickets (aligned with industry standards)
-    tickets_normalized = normalize(
-        account.tickets_last_30d,
-        min_val=0, max_val=TICKETS_30D_MAX, inverse=True
-    )
-    tickets_score = tickets_normalized * 8
-    base_score += tickets_score
-    
-    if account.tickets_last_30d > 15:
-        factors.append(HealthFactor("High ticket volume", tickets_score - 8))
-    elif account.tickets_last_30d == 0:
-        factors.append(HealthFactor("Zero support tickets", tickets_score))
+    tickets_score = normalize(tickets, 0, TICKETS_30D_MAX, inverse=True) * 8
+    base_score = base_score + tickets_score
+    factor("High ticket volume", tickets > 15, tickets_score - 8)
+    factor("Zero support tickets", tickets == 0, tickets_score)
     
     # 7. Critical Tickets 90d (8 points - inverse)
-    # Range: 0-5 critical tickets (aligned with industry standards)
-    critical_normalized = normalize(
-        account.critical_tickets_90d,
-        min_val=0, max_val=CRITICAL_TICKETS_MAX, inverse=True
-    )
-    critical_score = critical_normalized * 8
-    base_score += critical_score
-    
-    if account.critical_tickets_90d > 2:
-        factors.append(HealthFactor("Multiple critical issues", critical_score - 8))
+    critical_score = normalize(critical, 0, CRITICAL_TICKETS_MAX, inverse=True) * 8
+    base_score = base_score + critical_score
+    factor("Multiple critical issues", critical > 2, critical_score - 8)
     
     # 8. SLA Breaches 90d (4 points - inverse)
-    # Range: 0-3 breaches (aligned with industry standards)
-    sla_normalized = normalize(
-        account.sla_breaches_90d,
-        min_val=0, max_val=SLA_BREACHES_MAX, inverse=True
-    )
-    sla_score = sla_normalized * 4
-    base_score += sla_score
-    
-    if account.sla_breaches_90d > 1:
-        factors.append(HealthFactor("SLA breaches", sla_score - 4))
+    sla_score = normalize(sla, 0, SLA_BREACHES_MAX, inverse=True) * 4
+    base_score = base_score + sla_score
+    factor("SLA breaches", sla > 1, sla_score - 4)
     
     # ========================================
     # ADVOCACY (15 points total)
     # ========================================
     
-    # 9. NPS Score (15 points)
-    if account.nps is not None:
-        # Map from [-100, 100] to [0, 1]
-        nps_normalized = (account.nps + 100) / 200
-        nps_score = nps_normalized * 15
-        base_score += nps_score
-        
-        if account.nps >= 50:
-            factors.append(HealthFactor("Promoter NPS", nps_score))
-        elif account.nps < 0:
-            factors.append(HealthFactor("Detractor NPS", nps_score - 15))
-    else:
-        # No NPS data, assume neutral
-        base_score += 7.5
+    # 9. NPS Score (15 points), mapped from [-100, 100]; neutral 7.5 when unknown
+    has_nps = ~np.isnan(nps)
+    nps_score = (nps + 100) / 200 * 15
+    base_score = base_score + np.where(has_nps, nps_score, 7.5)
+    factor("Promoter NPS", has_nps & (nps >= 50), nps_score)
+    factor("Detractor NPS", has_nps & (nps < 0), nps_score - 15)
     
     # ========================================
     # CS PROCESS HYGIENE (10 points total)
     # ========================================
     
-    # 10. Days Since QBR (5 points - inverse)
-    # Range: 0-120 days (aligned with industry standards)
-    if account.qbr_last_date:
-        days_since_qbr = (date.today() - account.qbr_last_date).days
-        qbr_normalized = normalize(
-            days_since_qbr,
-            min_val=0, max_val=QBR_DAYS_MAX, inverse=True
-        )
-        qbr_score = qbr_normalized * 5
-        base_score += qbr_score
-        
-        if days_since_qbr > 90:
-            factors.append(HealthFactor("Overdue QBR", qbr_score - 5))
-    else:
-        # No QBR history - penalty
-        qbr_score = 0
-        base_score += qbr_score
-        factors.append(HealthFactor("No QBR history", -5))
-    
-    # 11. Onboarding Phase (5 points)
-    # Binary logic: 0 if stuck in onboarding with slow TTV, else 5
-    if account.onboarding_phase and account.time_to_value_days and account.time_to_value_days > 30:
-        # Stuck in onboarding - penalty
-        onboarding_score = 0
-        base_score += onboarding_score
-        factors.append(HealthFactor("Extended onboarding", -5))
-    else:
-        # Normal state, full points
-        onboarding_score = 5
-        base_score += onboarding_score
+    # 10. Days Since QBR (5 points - inverse); no QBR history scores 0
+    has_qbr = ~np.isnan(days_since_qbr)
+    qbr_score = normalize(days_since_qbr, 0, QBR_DAYS_MAX, inverse=True) * 5
+    base_score = base_score + np.where(has_qbr, qbr_score, 0)
+    factor("Overdue QBR", has_qbr & (days_since_qbr > 90), qbr_score - 5)
+    factor("No QBR history", ~has_qbr, -5)
+    
+    # 11. Onboarding Phase (5 points): 0 if stuck in onboarding with slow TTV
+    stuck = onboarding & has_ttv & (ttv > 30)
+    base_score = base_score + np.where(stuck, 0, 5)
+    factor("Extended onboarding", stuck, -5)
     
     # ========================================
     # COMMERCIAL SIGNAL (Bonus ±10 points)
     # ========================================
     
-    commercial_bonus = 0.0
-    
-    # Expansion opportunity bonus
-    if account.expansion_oppty_dollar > 0 and account.arr > 0:
-        expansion_ratio = account.expansion_oppty_dollar / account.arr
-        # 0-50% expansion opportunity gives 0-10 bonus points
-        expansion_bonus = min(10, expansion_ratio * 20)
-        commercial_bonus += expansion_bonus
-        
-        if expansion_bonus >= 5:
-            factors.append(HealthFactor("Strong expansion opportunity", expansion_bonus))
-    
-    # Renewal date proximity with weak adoption - penalty
-    if account.renewal_date:
-        days_to_renewal = (account.renewal_date - date.today()).days
-        if 0 <= days_to_renewal <= 60:
-            # Near renewal
-            if adoption_ratio < 0.5:
-                # Weak adoption near renewal - penalty
-                renewal_penalty = -5
-                commercial_bonus += renewal_penalty
-                factors.append(HealthFactor("Renewal risk: low adoption", renewal_penalty))
+    # Expansion opportunity: 0-50% of ARR gives 0-10 bonus points
+    has_expansion = (expansion > 0) & (arr > 0)
+    expansion_bonus = np.where(
+        has_expansion, np.minimum(10, expansion / np.where(arr > 0, arr, 1) * 20), 0.0
+    )
+    factor("Strong expansion opportunity", has_expansion & (expansion_bonus >= 5), expansion_bonus)
+    
+    # Weak adoption within 60 days of renewal - penalty
+    renewal_risk = (
+        ~np.isnan(days_to_renewal) & (days_to_renewal >= 0) & (days_to_renewal <= 60)
+        & (adoption_ratio < 0.5)
+    )
+    commercial_bonus = expansion_bonus + np.where(renewal_risk, -5, 0)
+    factor("Renewal risk: low adoption", renewal_risk, -5)
     
     # ========================================
     # FINAL SCORE
     # ========================================
     
-    final_score = base_score + commercial_bonus
-    final_score = max(0, min(110, final_score))  # Clamp to 0-110
-    
-    # Determine risk label
-    if final_score >= 75:
-        risk_label = "Green"
-    elif final_score >= 50:
-        risk_label = "Amber"
-    else:
-        risk_label = "Red"
+    scores = np.clip(base_score + commercial_bonus, 0, 110)  # Clamp to 0-110
+    risk_labels = np.select(
+        [scores >= GREEN_MIN_SCORE, scores >= AMBER_MIN_SCORE], ["Green", "Amber"], default="Red"
+    )
     
-    # Sort factors by absolute impact (highest first)
-    factors.sort(key=lambda f: abs(f.impact), reverse=True)
+    return scores, risk_labels, impacts
+
+
+def _round1(values: np.ndarray) -> np.ndarray:
+    """
+    Python's round(x, 1) over an array.
     
-    # Keep top 10 factors
-    top_factors = factors[:10]
+    np.round scales by 10 first, which can tip values sitting next to a .x5
+    tie the other way; those few are redone with the builtin.
+    """
+    rounded = np.round(values, 1)
+    scaled = values * 10
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(float(v), 1) for v in values[near_tie]]
+    return rounded
+
+
+def _top_factor_order(impacts: np.ndarray, limit: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Impacts rounded to one decimal as round() does, plus the column order of
+    each account's top factors and whether each one fired: highest absolute
+    (rounded) impact first, ties kept in FACTOR_NAMES order.
     
-    return final_score, top_factors, risk_label
+    Classifies the whole impact matrix with one stable argsort instead of a
+    filter + sort per account.
+    """
+    rounded = _round1(impacts)
+    fired = ~np.isnan(rounded)
+    keys = np.where(fired, -np.abs(rounded), np.inf)
+    order = np.argsort(keys, axis=1, kind="stable")[:, :limit]
+    return rounded, order, np.take_along_axis(fired, order, axis=1)
 
 
-def save_health_snapshot(session, account: models.Account) -> models.HealthSnapshot:
+def top_factor_dicts_bulk(impacts: np.ndarray, limit: int = 10) -> List[List[dict]]:
     """
-    Calculate and save a health snapshot for an account.
+    Top factors for every account as {"factor", "impact"} dicts, ready for
+    the snapshot JSON.
     """
-    score, factors, risk_label = calculate_health_score(account)
-    
-    # Update account
-    account.health_score = score
-    account.health_bucket = models.HealthBucketEnum[risk_label.upper()]
-    
-    # Create snapshot
-    snapshot = models.HealthSnapshot(
-        account_id=account.id,
-        calculated_at=datetime.utcnow(),
-        score=score,
-        risk_label=models.HealthBucketEnum[risk_label.upper()],
-        top_factors=json.dumps([f.to_dict() for f in factors])
-    )
+    rounded, order, order_fired = _top_factor_order(impacts, limit)
     
-    session.add(snapshot)
-    session.add(account)
-    session.commit()
-    session.refresh(snapshot)
+    return [
+        [{"factor": FACTOR_NAMES[i], "impact": float(rounded_row[i])} for i in row_order[row_fired]]
+        for rounded_row, row_order, row_fired in zip(rounded, order, order_fired)
+    ]
+
+
+def health_bucket_sql(score):
+    """SQL CASE mapping a health score column to its HealthBucketEnum value."""
+    bucket_type = models.Account.__table__.c.health_bucket.type
+    return case(
+        (score >= GREEN_MIN_SCORE, literal(models.HealthBucketEnum.GREEN, bucket_type)),
+        (score >= AMBER_MIN_SCORE, literal(models.HealthBucketEnum.AMBER, bucket_type)),
+        else_=literal(models.HealthBucketEnum.RED, bucket_type),
+    )
+
+
+def _health_snapshot_rows(account_ids: Sequence[int], columns: Mapping) -> List[dict]:
+    """Score accounts given as column lists into HealthSnapshot row mappings."""
+    scores, labels, impacts = calculate_health_scores_vec(columns)
+    calculated_at = datetime.utcnow()
+    buckets = {label: models.HealthBucketEnum[label.upper()] for label in np.unique(labels).tolist()}
+    
+    return [
+        {
+            "account_id": account_id,
+            "calculated_at": calculated_at,
+            "score": score,
+            "risk_label": buckets[risk_label],
+            "top_factors": factors,
+        }
+        for account_id, score, risk_label, factors in zip(
+            account_ids, scores.tolist(), labels.tolist(), top_factor_dicts_bulk(impacts)
+        )
+    ]
+
+
+def _update_account_scores(
+    session, snapshot_rows: Sequence[dict], account_ids: Optional[Sequence[int]] = None
+) -> None:
+    """
+    Write snapshot scores back to their accounts.
     
-    return snapshot
+    Account scores are written by primary key in one executemany; the
+    health_bucket column is then derived from health_score by a single
+    set-based UPDATE, so it can never drift from the stored score. The
+    UPDATE covers only `account_ids` when given (all accounts otherwise),
+    so accounts outside a scoped recompute keep their bucket.
+    """
+    Account = models.Account
+    bucket = health_bucket_sql(Account.health_score)
+    session.exec(
+        update(Account),
+        params=[{"id": row["account_id"], "health_score": row["score"]} for row in snapshot_rows]
+    )
+    statement = update(Account).where(Account.health_bucket.is_distinct_from(bucket))
+    if account_ids is not None:
+        statement = statement.where(Account.id.in_([row["account_id"] for row in snapshot_rows]))
+    session.exec(
+        statement.values(health_bucket=bucket).execution_options(synchronize_session=False)
+    )
 
 
 def recompute_all_health_scores(session) -> int:
     """
     Recompute health scores for all accounts.
     """
-    from sqlmodel import select
+    return recompute_health_scores(session)
+
+
+def recompute_health_scores(session, account_ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Recompute health scores for the given accounts (all when None).
     
-    accounts = session.exec(select(models.Account)).all()
-    count = 0
+    Reads only the scoring columns as plain rows, without loading Account
+    entities, and inserts the snapshots in one executemany.
+    """
+    from sqlmodel import select
     
-    for account in accounts:
-        save_health_snapshot(session, account)
-        count += 1
+    Account = models.Account
+    statement = select(Account.id, *(getattr(Account, col) for col in SCORING_COLUMNS))
+    if account_ids is not None:
+        statement = statement.where(Account.id.in_(account_ids))
+    rows = session.exec(statement).all()
+    if not rows:
+        return 0
+    
+    ids, *values = zip(*rows)
+    snapshot_rows = _health_snapshot_rows(ids, dict(zip(SCORING_COLUMNS, values)))
+    session.exec(insert(models.HealthSnapshot), params=snapshot_rows)
+    _update_account_scores(session, snapshot_rows, account_ids)
+    session.commit()
     
-    return count
+    return len(snapshot_rows)
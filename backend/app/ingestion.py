@@ -0,0 +1,425 @@
+"""
+Bulk CSV ingestion for accounts and daily metrics.
+
+Existing accounts are resolved with a single IN query and written with one
+executemany; daily metrics go out as multi-VALUES INSERTs that skip days
+already stored. This replaces a SELECT + INSERT/UPDATE round trip per
+account and per metric day. Uploads are consumed in fixed-size
+chunks so memory stays flat regardless of file size; PyArrow's CSV
+reader is used for parsing when it is installed.
+"""
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+
+from . import models, health_scoring
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Optional account columns: name -> (caster, default for new accounts).
+# Missing/NaN values fall back to the default on create and leave the
+# stored value untouched on update.
+ACCOUNT_COLUMNS = {
+    "industry": (str, None),
+    "region": (str, None),
+    "renewal_date": (None, None),
+    "cs_owner": (str, None),
+    # Adoption
+    "active_users": (int, 0),
+    "seats_purchased": (int, 1),
+    "feature_x_adoption": (float, 0.0),
+    "weekly_active_pct": (float, 0.0),
+    "time_to_value_days": (int, None),
+    # Support
+    "tickets_last_30d": (int, 0),
+    "critical_tickets_90d": (int, 0),
+    "sla_breaches_90d": (int, 0),
+    "nps": (float, None),
+    "qbr_last_date": (None, None),
+    "onboarding_phase": (bool, False),
+    # Commercial
+    "expansion_oppty_dollar": (float, 0.0),
+    "renewal_risk": (models.RenewalRiskEnum, None),
+}
+
+# Enum members by value, built once so columns map to members in one lookup
+_ENUM_BY_VALUE = {
+    enum: {member.value: member for member in enum}
+    for enum in (models.SegmentEnum, models.RenewalRiskEnum)
+}
+
+DATE_COLUMNS = ["renewal_date", "qbr_last_date", "date"]
+DATE_FORMAT = "%Y-%m-%d"
+
+# Daily metric columns: name -> (dtype, default)
+METRIC_COLUMNS = {
+    "logins": (int, 0),
+    "events": (int, 0),
+    "feature_x_events": (int, 0),
+    "avg_session_min": (float, 0.0),
+    "errors": (int, 0),
+    "ticket_backlog": (int, 0),
+}
+
+
+# Marks a blank optional cell in cast account columns
+_MISSING = object()
+
+# Rows per pd.read_csv chunk
+CSV_CHUNK_ROWS = 50_000
+
+# Rows per multi-VALUES metrics INSERT; 1000 x 9 columns stays well under
+# the bind-parameter limits of SQLite (32766) and Postgres (65535)
+METRICS_BATCH_ROWS = 1000
+
+# Accepted spellings of boolean cells (compared lower-cased)
+_BOOLEAN_VALUES = {"true": True, "t": True, "yes": True, "1": True,
+                   "false": False, "f": False, "no": False, "0": False}
+
+# Bytes per PyArrow CSV block (roughly CSV_CHUNK_ROWS rows of account data)
+CSV_BLOCK_BYTES = 8 << 20
+
+
+# Every column ingest reads; PyArrow parses only these
+CSV_COLUMNS = ["name", "arr", "segment", *ACCOUNT_COLUMNS, "date", *METRIC_COLUMNS]
+
+
+def _read_csv_chunks_arrow(fileobj: BinaryIO) -> Iterator[pd.DataFrame]:
+    # Known columns only, all read as text: the streaming reader infers types
+    # from the first block, and one bad cell in a typed column would fail the
+    # whole read. _account_columns casts them and reports bad cells per account.
+    header = fileobj.readline().decode("utf-8-sig")
+    fileobj.seek(0)
+    columns = [col for col in next(csv.reader([header]), []) if col in CSV_COLUMNS]
+    
+    reader = pa_csv.open_csv(
+        fileobj,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={col: pa.string() for col in columns},
+            include_columns=columns,
+            strings_can_be_null=True,
+        ),
+    )
+    
+    yielded = False
+    for batch in reader:
+        yielded = True
+        yield batch.to_pandas()
+    
+    if not yielded:
+        # Header-only file: still hand back the columns
+        yield reader.schema.empty_table().to_pandas()
+
+
+def read_csv_chunks(fileobj: BinaryIO) -> Iterator[pd.DataFrame]:
+    """
+    Parse an uploaded CSV as a stream of DataFrame chunks.
+
+    Always yields at least one (possibly empty) chunk carrying the header
+    columns. Parsing uses PyArrow's multi-threaded block reader when
+    available and falls back to pandas' chunked C reader. Cells come back
+    as text; casting is left to ingest.
+    """
+    if PYARROW_AVAILABLE:
+        yield from _read_csv_chunks_arrow(fileobj)
+        return
+    
+    # Numbers are left to the per-column casts, which report bad cells
+    # per account instead of failing the whole read
+    with pd.read_csv(fileobj, chunksize=CSV_CHUNK_ROWS, dtype=str) as reader:
+        yield from reader
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """
+    Parse a date column to `date` objects (NaT for unparseable cells).
+
+    ISO dates go through the fixed-format parser, which skips pandas' format
+    inference; anything else is retried with inference so other layouts
+    still load.
+    """
+    parsed = pd.to_datetime(values, format=DATE_FORMAT, errors="coerce")
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], errors="coerce")
+    return parsed.dt.date
+
+
+def _cast_column(values: pd.Series, caster) -> Tuple[pd.Series, np.ndarray]:
+    """
+    Cast a whole column of CSV cells the way `caster` casts one value.
+
+    Returns the cast values and a mask of the cells that do not convert.
+    Numbers may arrive as text or already parsed; ints truncate like int().
+    """
+    if caster is None:
+        return values, np.zeros(len(values), dtype=bool)
+    if isinstance(caster, type) and issubclass(caster, Enum):
+        cast = values.map(_ENUM_BY_VALUE[caster])
+    elif caster is bool:
+        cast = values.astype(str).str.strip().str.lower().map(_BOOLEAN_VALUES)
+    elif caster is str:
+        return values.astype(str), np.zeros(len(values), dtype=bool)
+    else:
+        cast = pd.to_numeric(values, errors="coerce")
+        if caster is int:
+            invalid = cast.isna().to_numpy()
+            return np.trunc(cast.fillna(0)).astype("int64"), invalid
+    return cast, cast.isna().to_numpy()
+
+
+def _account_columns(rows: pd.DataFrame, present: List[str]) -> Tuple[Dict[str, list], Dict[int, str]]:
+    """
+    Cast the account columns of `rows` with one vectorized pass per column.
+
+    Returns the cast values per column (_MISSING for blank optional cells)
+    and the first cast error per row position, naming the offending cell.
+    """
+    columns: Dict[str, list] = {}
+    errors: Dict[int, str] = {}
+    casters = [("arr", float, False), ("segment", models.SegmentEnum, False)]
+    casters += [(col, ACCOUNT_COLUMNS[col][0], True) for col in present]
+
+    for col, caster, optional in casters:
+        series = rows[col]
+        mask = series.notna().to_numpy() if optional else np.ones(len(series), dtype=bool)
+        values = np.full(len(series), _MISSING, dtype=object)
+        cast, invalid = _cast_column(series[mask], caster)
+        values[mask] = cast.tolist()
+        for pos in np.flatnonzero(mask)[invalid].tolist():
+            value = series.iat[pos]
+            if isinstance(caster, type) and issubclass(caster, Enum):
+                errors.setdefault(pos, f"{value!r} is not a valid {caster.__name__}")
+            else:
+                errors.setdefault(pos, f"invalid {col} value {value!r}")
+        columns[col] = values.tolist()
+
+    return columns, errors
+
+
+def _copy_new_metrics(db: Session, metrics: pd.DataFrame) -> int:
+    """
+    Postgres/psycopg2 fast path: COPY the chunk into a temp staging table,
+    then move it across with one INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+    """
+    table = models.AccountMetricsDaily.__tablename__
+    columns = ", ".join(metrics.columns)
+    buffer = io.StringIO()
+    metrics.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    # Raw DBAPI connection inside the session's transaction
+    cursor = db.connection().connection.cursor()
+    try:
+        # The upload is one transaction, so the staging table is dropped
+        # here rather than on commit, ready for the next chunk
+        cursor.execute(
+            f"CREATE TEMP TABLE metrics_staging AS "
+            f"SELECT {columns} FROM {table} WITH NO DATA"
+        )
+        cursor.copy_expert(f"COPY metrics_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM metrics_staging "
+            f"ON CONFLICT DO NOTHING"
+        )
+        inserted = cursor.rowcount
+        cursor.execute("DROP TABLE metrics_staging")
+        return inserted
+    finally:
+        cursor.close()
+
+
+def _insert_new_metrics(db: Session, metrics: pd.DataFrame) -> int:
+    """
+    Insert daily metric rows, skipping (account_id, date) pairs already stored.
+
+    On Postgres with psycopg2 the rows are streamed with COPY. Otherwise on
+    SQLite and Postgres each batch is one multi-VALUES INSERT ... ON
+    CONFLICT DO NOTHING, relying on ix_metrics_account_date. Other dialects
+    fall back to an existence lookup plus executemany.
+
+    Returns:
+        Number of rows actually inserted
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+        return _copy_new_metrics(db, metrics)
+
+    rows = metrics.to_dict("records")
+    dialect = dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        account_ids = list({r["account_id"] for r in rows})
+        existing_keys = set(
+            db.exec(
+                select(models.AccountMetricsDaily.account_id, models.AccountMetricsDaily.date)
+                .where(models.AccountMetricsDaily.account_id.in_(account_ids))
+            ).all()
+        )
+        rows = [r for r in rows if (r["account_id"], r["date"]) not in existing_keys]
+        if rows:
+            db.exec(insert(models.AccountMetricsDaily), params=rows)
+        return len(rows)
+
+    inserted = 0
+    for start in range(0, len(rows), METRICS_BATCH_ROWS):
+        stmt = (
+            dialect_insert(models.AccountMetricsDaily)
+            .values(rows[start:start + METRICS_BATCH_ROWS])
+            .on_conflict_do_nothing()
+        )
+        inserted += db.exec(stmt).rowcount
+    return inserted
+
+
+def _ingest_chunk(
+    db: Session,
+    df: pd.DataFrame,
+    known_ids: Dict[str, int],
+    seen: Set[str],
+    errors: List[str],
+) -> Tuple[int, int, int]:
+    """
+    Upsert accounts and insert new daily metrics for one CSV chunk.
+
+    An account is upserted from the first row it appears in across the
+    whole upload; later chunks only contribute its metric rows.
+    `known_ids` and `seen` carry that state between chunks.
+    """
+    df = df[df["name"].notna()].copy()
+
+    # Parse date columns once for the whole chunk
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = _parse_dates(df[col])
+
+    # ---- Accounts: one lookup, one insert, one update ----
+    first_rows = df.drop_duplicates("name")
+    first_rows = first_rows[~first_rows["name"].isin(seen)]
+    names = first_rows["name"].tolist()
+    seen.update(names)
+    existing: Dict[str, int] = dict(
+        db.exec(
+            select(models.Account.name, models.Account.id).where(models.Account.name.in_(names))
+        ).all()
+    ) if names else {}
+
+    present = [col for col in ACCOUNT_COLUMNS if col in df.columns]
+    columns, cast_errors = _account_columns(first_rows, present)
+    now = datetime.utcnow()
+    new_rows: List[dict] = []
+    update_rows: List[dict] = []
+    valid_names: List[str] = []
+
+    for pos, name in enumerate(names):
+        if pos in cast_errors:
+            errors.append(f"Error processing account {name}: {cast_errors[pos]}")
+            continue
+
+        # Blank or absent cells take the default on create and leave
+        # updates untouched
+        values = {"arr": columns["arr"][pos], "segment": columns["segment"][pos]}
+        for col, (_, default) in ACCOUNT_COLUMNS.items():
+            value = columns[col][pos] if col in columns else _MISSING
+            if value is not _MISSING:
+                values[col] = value
+            elif name not in existing:
+                values[col] = default
+
+        if name in existing:
+            values.update(id=existing[name], updated_at=now)
+            update_rows.append(values)
+        else:
+            values.update(name=name, created_at=now, updated_at=now)
+            new_rows.append(values)
+        valid_names.append(name)
+
+    if new_rows:
+        db.exec(insert(models.Account), params=new_rows)
+    if update_rows:
+        db.exec(update(models.Account), params=update_rows)
+
+    if valid_names:
+        known_ids.update(
+            db.exec(
+                select(models.Account.name, models.Account.id)
+                .where(models.Account.name.in_(valid_names))
+            ).all()
+        )
+
+    # ---- Daily metrics: batched INSERT ... ON CONFLICT DO NOTHING ----
+    metrics_created = 0
+    if "date" in df.columns:
+        # Resolve account ids with one hashed map over the name column; rows
+        # for unknown or failed accounts come back NaN and are dropped
+        account_ids = df["name"].map(known_ids)
+        metrics_df = df.assign(account_id=account_ids)[account_ids.notna() & df["date"].notna()]
+        metrics_df = metrics_df.drop_duplicates(["account_id", "date"])
+
+        if not metrics_df.empty:
+            metrics = pd.DataFrame({
+                "account_id": metrics_df["account_id"].astype(int),
+                "date": metrics_df["date"],
+            })
+            for col, (dtype, default) in METRIC_COLUMNS.items():
+                if col in metrics_df.columns:
+                    # Blank or non-numeric cells take the column default
+                    metrics[col] = (
+                        pd.to_numeric(metrics_df[col], errors="coerce").fillna(default).astype(dtype)
+                    )
+                else:
+                    metrics[col] = default
+
+            metrics_created = _insert_new_metrics(db, metrics)
+
+    return len(new_rows), len(update_rows), metrics_created
+
+
+def ingest_chunks(db: Session, chunks: Iterable[pd.DataFrame]) -> Tuple[int, int, int, List[str]]:
+    """
+    Ingest a CSV streamed as DataFrame chunks.
+
+    All chunks and the health scores of the ingested accounts are written in
+    one transaction: a failure in any chunk rolls back the whole upload.
+
+    Returns:
+        (accounts_created, accounts_updated, metrics_created, errors)
+    """
+    known_ids: Dict[str, int] = {}
+    seen: Set[str] = set()
+    errors: List[str] = []
+    created = updated = metrics_created = 0
+
+    try:
+        for chunk in chunks:
+            c, u, m = _ingest_chunk(db, chunk, known_ids, seen, errors)
+            created += c
+            updated += u
+            metrics_created += m
+
+        # Score all ingested accounts in one vectorized pass; this commits
+        if known_ids:
+            health_scoring.recompute_health_scores(db, list(known_ids.values()))
+        else:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return created, updated, metrics_created, errors
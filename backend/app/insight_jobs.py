@@ -0,0 +1,98 @@
+"""
+In-process job registry for AI insight generation (and other slow
+endpoints such as the health recompute).
+
+Lets the insight endpoints hand back a job id immediately instead of
+holding the request open for the whole OpenAI round trip, and coalesces
+identical in-flight requests onto a single call. Jobs live in this
+process only: a poll that reaches another uvicorn worker or Lambda instance
+does not find them, and on Lambda a background job may not outlive the
+invocation that started it, so clients there should keep using the
+synchronous form.
+"""
+import asyncio
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# Finished jobs kept around for polling before the oldest are evicted
+MAX_JOBS = 256
+
+
+class InsightJob:
+    """A single insight generation running as an asyncio task"""
+    def __init__(self, job_id: str, key: Hashable, task: "asyncio.Future[Any]"):
+        self.job_id = job_id
+        self.key = key
+        self.task = task
+
+    @property
+    def status(self) -> str:
+        if not self.task.done():
+            return "pending"
+        if self.task.cancelled() or self.task.exception() is not None:
+            return "failed"
+        return "completed"
+
+    @property
+    def result(self) -> Any:
+        return self.task.result() if self.status == "completed" else None
+
+    @property
+    def error(self) -> Optional[str]:
+        if self.status != "failed":
+            return None
+        if self.task.cancelled():
+            return "Job was cancelled"
+        return str(self.task.exception())
+
+
+_jobs: "OrderedDict[str, InsightJob]" = OrderedDict()
+_inflight: Dict[Hashable, InsightJob] = {}
+
+
+def _on_done(job: InsightJob) -> None:
+    if _inflight.get(job.key) is job:
+        del _inflight[job.key]
+    # Mark the exception as retrieved; callers read it via job.error
+    if not job.task.cancelled():
+        job.task.exception()
+
+
+def _evict() -> None:
+    while len(_jobs) > MAX_JOBS:
+        oldest = next(iter(_jobs.values()))
+        if not oldest.task.done():
+            break
+        _jobs.popitem(last=False)
+
+
+def submit(key: Hashable, factory: Callable[[], Awaitable[Any]]) -> InsightJob:
+    """
+    Start generating an insight in the background, or join the job already
+    running for the same key.
+    """
+    job = _inflight.get(key)
+    if job is not None:
+        return job
+
+    job = InsightJob(uuid.uuid4().hex, key, asyncio.ensure_future(factory()))
+    _jobs[job.job_id] = job
+    _inflight[key] = job
+    job.task.add_done_callback(lambda _: _on_done(job))
+    _evict()
+    return job
+
+
+def get(job_id: str) -> Optional[InsightJob]:
+    """Look up a job by id"""
+    return _jobs.get(job_id)
+
+
+async def run(key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Generate an insight and wait for it, sharing the call with any identical
+    request already in flight. A disconnecting client does not cancel the
+    shared task.
+    """
+    return await asyncio.shield(submit(key, factory).task)
@@ -2,25 +2,35 @@
 AI Success Insights API - Complete implementation matching specification.
 FastAPI + SQLModel + explainable health scoring
 """
-import io
-import json
+import asyncio
+import hashlib
+import itertools
+import logging
 import time
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-import pandas as pd
+import numpy as np
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Query
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import Session, select, delete
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Row, insert
+from sqlmodel import Session, select, delete, func, case
 
-from .database import get_db, init_db
-from . import models, schemas, health_scoring
-from .ai_service import ai_service
+from .database import engine, get_db, init_db
+from . import models, schemas, health_scoring, insight_jobs, serialization
+from .ai_service import AIInsightsService, get_ai_service
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Process-wide logging is configured here, at the entry point, rather than by
+# the modules that log. A no-op where the host (e.g. Lambda) already set it up.
+logging.basicConfig(level=logging.INFO)
+
 app = FastAPI(
     title="AI Success Insights API",
     description="Customer Success Analytics with Explainable Health Scoring",
@@ -41,11 +51,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ?background=true jobs live in the memory of the process that started them
+# (see insight_jobs), so they can only be polled on that same process
+BACKGROUND_QUERY_DESCRIPTION = (
+    "Return a job id immediately instead of waiting. Jobs are kept in the "
+    "server process that started them: on Lambda or with several workers a "
+    "poll may reach another process and get 404, and a frozen Lambda "
+    "instance may drop the job, so use the synchronous form there."
+)
+
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Initialize database on startup and warm up the OpenAI connection"""
     init_db()
+    # In the background, so startup does not wait on OpenAI; the reference
+    # keeps the task from being garbage collected mid-flight
+    app.state.openai_warm_up = asyncio.create_task(get_ai_service().warm_up())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the OpenAI connection pool on shutdown"""
+    await get_ai_service().aclose()
 
 
 @app.get("/")
@@ -63,7 +91,7 @@ async def root():
 # ==================== CSV INGESTION ====================
 
 @app.post("/ingest/csv", response_model=schemas.CSVUploadResponse)
-async def ingest_csv(
+def ingest_csv(
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
@@ -77,155 +105,30 @@ async def ingest_csv(
     - Commercial: expansion_oppty_dollar, renewal_risk
     - Daily metrics (optional): date, logins, events, feature_x_events, avg_session_min, errors, ticket_backlog
     """
+    # Imported here so pandas (and pyarrow) load only for uploads, not on
+    # every Lambda cold start
+    from . import ingestion
+    
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
     try:
-        # Read CSV
-        contents = await file.read()
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-        
-        accounts_created = 0
-        accounts_updated = 0
-        metrics_created = 0
-        errors = []
+        # Stream the spooled upload straight into the parser, one chunk at a time
+        chunks = ingestion.read_csv_chunks(file.file)
+        first_chunk = next(chunks)
         
         # Required account columns
         required_cols = ['name', 'arr', 'segment']
-        if not all(col in df.columns for col in required_cols):
+        if not all(col in first_chunk.columns for col in required_cols):
             raise HTTPException(
                 status_code=400,
                 detail=f"CSV must contain columns: {', '.join(required_cols)}"
             )
         
-        # Process each unique account
-        for account_name in df['name'].unique():
-            account_df = df[df['name'] == account_name]
-            
-            try:
-                # Get or create account
-                statement = select(models.Account).where(models.Account.name == account_name)
-                account = db.exec(statement).first()
-                
-                first_row = account_df.iloc[0]
-                
-                if not account:
-                    # Create new account
-                    account = models.Account(
-                        name=account_name,
-                        arr=float(first_row['arr']),
-                        segment=models.SegmentEnum(first_row['segment']),
-                        industry=first_row.get('industry'),
-                        region=first_row.get('region'),
-                        renewal_date=pd.to_datetime(first_row['renewal_date']).date() if pd.notna(first_row.get('renewal_date')) else None,
-                        cs_owner=first_row.get('cs_owner'),
-                        
-                        # Adoption
-                        active_users=int(first_row.get('active_users', 0)),
-                        seats_purchased=int(first_row.get('seats_purchased', 1)),
-                        feature_x_adoption=float(first_row.get('feature_x_adoption', 0)),
-                        weekly_active_pct=float(first_row.get('weekly_active_pct', 0)),
-                        time_to_value_days=int(first_row['time_to_value_days']) if pd.notna(first_row.get('time_to_value_days')) else None,
-                        
-                        # Support
-                        tickets_last_30d=int(first_row.get('tickets_last_30d', 0)),
-                        critical_tickets_90d=int(first_row.get('critical_tickets_90d', 0)),
-                        sla_breaches_90d=int(first_row.get('sla_breaches_90d', 0)),
-                        nps=float(first_row['nps']) if pd.notna(first_row.get('nps')) else None,
-                        qbr_last_date=pd.to_datetime(first_row['qbr_last_date']).date() if pd.notna(first_row.get('qbr_last_date')) else None,
-                        onboarding_phase=bool(first_row.get('onboarding_phase', False)),
-                        
-                        # Commercial
-                        expansion_oppty_dollar=float(first_row.get('expansion_oppty_dollar', 0)),
-                        renewal_risk=models.RenewalRiskEnum(first_row['renewal_risk']) if pd.notna(first_row.get('renewal_risk')) else None,
-                    )
-                    db.add(account)
-                    db.commit()
-                    db.refresh(account)
-                    accounts_created += 1
-                else:
-                    # Update existing account
-                    account.arr = float(first_row['arr'])
-                    account.segment = models.SegmentEnum(first_row['segment'])
-                    if 'industry' in first_row:
-                        account.industry = first_row.get('industry')
-                    if 'region' in first_row:
-                        account.region = first_row.get('region')
-                    if pd.notna(first_row.get('renewal_date')):
-                        account.renewal_date = pd.to_datetime(first_row['renewal_date']).date()
-                    if 'cs_owner' in first_row:
-                        account.cs_owner = first_row.get('cs_owner')
-                    
-                    # Update metrics if present
-                    if 'active_users' in first_row:
-                        account.active_users = int(first_row.get('active_users', 0))
-                    if 'seats_purchased' in first_row:
-                        account.seats_purchased = int(first_row.get('seats_purchased', 1))
-                    if 'feature_x_adoption' in first_row:
-                        account.feature_x_adoption = float(first_row.get('feature_x_adoption', 0))
-                    if 'weekly_active_pct' in first_row:
-                        account.weekly_active_pct = float(first_row.get('weekly_active_pct', 0))
-                    if pd.notna(first_row.get('time_to_value_days')):
-                        account.time_to_value_days = int(first_row['time_to_value_days'])
-                    
-                    if 'tickets_last_30d' in first_row:
-                        account.tickets_last_30d = int(first_row.get('tickets_last_30d', 0))
-                    if 'critical_tickets_90d' in first_row:
-                        account.critical_tickets_90d = int(first_row.get('critical_tickets_90d', 0))
-                    if 'sla_breaches_90d' in first_row:
-                        account.sla_breaches_90d = int(first_row.get('sla_breaches_90d', 0))
-                    if pd.notna(first_row.get('nps')):
-                        account.nps = float(first_row['nps'])
-                    if pd.notna(first_row.get('qbr_last_date')):
-                        account.qbr_last_date = pd.to_datetime(first_row['qbr_last_date']).date()
-                    if 'onboarding_phase' in first_row:
-                        account.onboarding_phase = bool(first_row.get('onboarding_phase', False))
-                    
-                    if 'expansion_oppty_dollar' in first_row:
-                        account.expansion_oppty_dollar = float(first_row.get('expansion_oppty_dollar', 0))
-                    if pd.notna(first_row.get('renewal_risk')):
-                        account.renewal_risk = models.RenewalRiskEnum(first_row['renewal_risk'])
-                    
-                    account.updated_at = datetime.utcnow()
-                    db.add(account)
-                    db.commit()
-                    db.refresh(account)
-                    accounts_updated += 1
-                
-                # Process daily metrics if present
-                if 'date' in df.columns:
-                    for _, row in account_df.iterrows():
-                        if pd.notna(row.get('date')):
-                            metric_date = pd.to_datetime(row['date']).date()
-                            
-                            # Check if exists
-                            stmt = select(models.AccountMetricsDaily).where(
-                                models.AccountMetricsDaily.account_id == account.id,
-                                models.AccountMetricsDaily.date == metric_date
-                            )
-                            existing = db.exec(stmt).first()
-                            
-                            if not existing:
-                                metric = models.AccountMetricsDaily(
-                                    account_id=account.id,
-                                    date=metric_date,
-                                    logins=int(row.get('logins', 0)),
-                                    events=int(row.get('events', 0)),
-                                    feature_x_events=int(row.get('feature_x_events', 0)),
-                                    avg_session_min=float(row.get('avg_session_min', 0)),
-                                    errors=int(row.get('errors', 0)),
-                                    ticket_backlog=int(row.get('ticket_backlog', 0)),
-                                )
-                                db.add(metric)
-                                metrics_created += 1
-                
-                # Calculate health score and create snapshot
-                health_scoring.save_health_snapshot(db, account)
-                
-            except Exception as e:
-                errors.append(f"Error processing account {account_name}: {str(e)}")
-        
-        db.commit()
+        accounts_created, accounts_updated, metrics_created, errors = ingestion.ingest_chunks(
+            db, itertools.chain([first_chunk], chunks)
+        )
+        invalidate_portfolio_cache()
         
         return schemas.CSVUploadResponse(
             message="CSV processed successfully",
@@ -240,7 +143,7 @@ async def ingest_csv(
 
 
 @app.post("/ingest/generate-mock", response_model=schemas.CSVUploadResponse)
-async def generate_mock_data(
+def generate_mock_data(
     count: int = Query(20, ge=1, le=100, description="Number of accounts to generate"),
     db: Session = Depends(get_db)
 ):
@@ -248,7 +151,6 @@ async def generate_mock_data(
     Generate random mock account data for testing and demos.
     Clears all existing data and creates fresh sample accounts with health metrics and daily data.
     """
-    import random
     from datetime import date, timedelta
     
     companies = [
@@ -262,164 +164,149 @@ async def generate_mock_data(
         "Iota Solutions", "Kappa Industries", "Lambda Tech", "Mu Enterprises"
     ]
     
-    segments = ["SMB", "Mid-Market", "Enterprise"]
+    segments = list(models.SegmentEnum)  # SMB, Mid-Market, Enterprise
     regions = ["North America", "Europe", "APAC", "LATAM"]
     industries = ["SaaS", "Healthcare", "Finance", "Retail", "Manufacturing", "Education"]
     cs_owners = ["Sarah Johnson", "Michael Chen", "Emily Rodriguez", "David Kim", "Jessica Taylor"]
-    
-    accounts_created = 0
-    metrics_created = 0
-    errors = []
+    days = 30
     
     try:
-        # Clear all existing data
+        # Clear all existing data; the new data replaces it in the same
+        # transaction, committed once at the end
         db.exec(delete(models.AccountMetricsDaily))
         db.exec(delete(models.HealthSnapshot))
         db.exec(delete(models.Account))
-        db.commit()
         
         # Select random companies
-        selected_companies = random.sample(companies, min(count, len(companies)))
+        rng = np.random.default_rng()
+        selected_companies = rng.choice(companies, min(count, len(companies)), replace=False).tolist()
+        n = len(selected_companies)
         
-        for idx, company_name in enumerate(selected_companies):
-            try:
-                # Generate random account data
-                segment = random.choice(segments)
-                
-                # ARR based on segment
-                if segment == "SMB":
-                    arr = random.randint(10_000, 100_000)
-                elif segment == "Mid-Market":
-                    arr = random.randint(100_000, 1_000_000)
-                else:  # Enterprise
-                    arr = random.randint(1_000_000, 10_000_000)
-                
-                # Create health profile distribution: 40% healthy, 40% moderate, 20% at-risk
-                health_profile = idx % 5  # 0,1 = healthy, 2,3 = moderate, 4 = at-risk
-                
-                seats = random.randint(20, 500)
-                
-                if health_profile < 2:  # Healthy accounts (40%)
-                    active_users = int(seats * random.uniform(0.75, 1.0))
-                    feature_adoption = random.uniform(0.6, 0.95)
-                    weekly_active = random.uniform(0.65, 0.9)
-                    tickets_30d = random.randint(0, 5)
-                    critical_tickets = random.randint(0, 1)
-                    sla_breaches = 0
-                    nps = random.uniform(40, 90)
-                    expansion_oppty = random.choice([0, random.randint(50_000, 500_000)])
-                    qbr_days_ago = random.randint(0, 60)
-                elif health_profile < 4:  # Moderate accounts (40%)
-                    active_users = int(seats * random.uniform(0.45, 0.75))
-                    feature_adoption = random.uniform(0.35, 0.65)
-                    weekly_active = random.uniform(0.4, 0.65)
-                    tickets_30d = random.randint(3, 12)
-                    critical_tickets = random.randint(1, 3)
-                    sla_breaches = random.randint(0, 1)
-                    nps = random.uniform(0, 50)
-                    expansion_oppty = 0 if random.random() > 0.3 else random.randint(10_000, 100_000)
-                    qbr_days_ago = random.randint(45, 120)
-                else:  # At-risk accounts (20%)
-                    active_users = int(seats * random.uniform(0.15, 0.45))
-                    feature_adoption = random.uniform(0.1, 0.4)
-                    weekly_active = random.uniform(0.15, 0.45)
-                    tickets_30d = random.randint(10, 25)
-                    critical_tickets = random.randint(2, 5)
-                    sla_breaches = random.randint(1, 3)
-                    nps = random.uniform(-50, 20)
-                    expansion_oppty = 0
-                    qbr_days_ago = random.randint(90, 180)
-                
-                account = models.Account(
-                    name=company_name,
-                    arr=float(arr),
-                    segment=models.SegmentEnum(segment),
-                    industry=random.choice(industries),
-                    region=random.choice(regions),
-                    renewal_date=(date.today() + timedelta(days=random.randint(30, 365))),
-                    cs_owner=random.choice(cs_owners),
-                    
-                    # Adoption metrics
-                    active_users=active_users,
-                    seats_purchased=seats,
-                    feature_x_adoption=feature_adoption,
-                    weekly_active_pct=weekly_active,
-                    time_to_value_days=random.randint(7, 90) if random.random() > 0.3 else None,
-                    
-                    # Support metrics
-                    tickets_last_30d=tickets_30d,
-                    critical_tickets_90d=critical_tickets,
-                    sla_breaches_90d=sla_breaches,
-                    nps=nps,
-                    qbr_last_date=(date.today() - timedelta(days=qbr_days_ago)),
-                    onboarding_phase=health_profile == 4 and random.random() > 0.5,  # Some at-risk are in onboarding
-                    
-                    # Commercial
-                    expansion_oppty_dollar=float(expansion_oppty),
-                    renewal_risk=(
-                        None if health_profile < 2 else
-                        models.RenewalRiskEnum.LOW if health_profile < 3 else
-                        models.RenewalRiskEnum.MED if health_profile < 4 else
-                        models.RenewalRiskEnum.HIGH
-                    ) if random.random() > 0.3 else None,
-                )
-                
-                db.add(account)
-                db.commit()
-                db.refresh(account)
-                accounts_created += 1
-                
-                # Generate 30 days of daily metrics aligned with health profile
-                for days_ago in range(30):
-                    metric_date = date.today() - timedelta(days=days_ago)
-                    
-                    # Align daily metrics with health profile
-                    if health_profile < 2:  # Healthy
-                        base_logins = active_users * random.uniform(0.65, 0.9)
-                        base_events = active_users * random.uniform(30, 60)
-                        session_time = random.uniform(20, 45)
-                        error_count = random.randint(0, 3)
-                        ticket_backlog = random.randint(0, 5)
-                    elif health_profile < 4:  # Moderate
-                        base_logins = active_users * random.uniform(0.4, 0.7)
-                        base_events = active_users * random.uniform(15, 35)
-                        session_time = random.uniform(10, 25)
-                        error_count = random.randint(2, 8)
-                        ticket_backlog = random.randint(3, 12)
-                    else:  # At-risk
-                        base_logins = active_users * random.uniform(0.2, 0.5)
-                        base_events = active_users * random.uniform(5, 20)
-                        session_time = random.uniform(5, 15)
-                        error_count = random.randint(5, 15)
-                        ticket_backlog = random.randint(8, 20)
-                    
-                    metric = models.AccountMetricsDaily(
-                        account_id=account.id,
-                        date=metric_date,
-                        logins=int(base_logins),
-                        events=int(base_events),
-                        feature_x_events=int(base_events * feature_adoption),
-                        avg_session_min=session_time,
-                        errors=error_count,
-                        ticket_backlog=ticket_backlog,
-                    )
-                    db.add(metric)
-                    metrics_created += 1
-                
-                # Calculate health score and create snapshot
-                health_scoring.save_health_snapshot(db, account)
-                
-            except Exception as e:
-                errors.append(f"Error creating account {company_name}: {str(e)}")
+        # Create health profile distribution: 40% healthy, 40% moderate, 20% at-risk
+        health_profile = np.arange(n) % 5  # 0,1 = healthy, 2,3 = moderate, 4 = at-risk
+        band = np.select([health_profile < 2, health_profile < 4], [0, 1], 2)
         
-        db.commit()
+        def band_uniform(ranges, per_day=False):
+            """Uniform draws from each account's (healthy, moderate, at-risk) range"""
+            low, high = np.array(ranges, dtype=float)[band].T
+            if per_day:
+                return rng.uniform(low[:, None], high[:, None], (n, days))
+            return rng.uniform(low, high)
+        
+        def band_randint(ranges, per_day=False):
+            """Inclusive integer draws from each account's (healthy, moderate, at-risk) range"""
+            low, high = np.array(ranges)[band].T
+            if per_day:
+                return rng.integers(low[:, None], high[:, None], (n, days), endpoint=True)
+            return rng.integers(low, high, endpoint=True)
+        
+        # ARR based on segment
+        segment_idx = rng.integers(0, len(segments), n)
+        arr_low, arr_high = np.array([
+            (10_000, 100_000), (100_000, 1_000_000), (1_000_000, 10_000_000),
+        ])[segment_idx].T
+        arr = rng.integers(arr_low, arr_high, endpoint=True)
+        
+        seats = rng.integers(20, 500, n, endpoint=True)
+        active_users = (seats * band_uniform([(0.75, 1.0), (0.45, 0.75), (0.15, 0.45)])).astype(int)
+        feature_adoption = band_uniform([(0.6, 0.95), (0.35, 0.65), (0.1, 0.4)])
+        weekly_active = band_uniform([(0.65, 0.9), (0.4, 0.65), (0.15, 0.45)])
+        tickets_30d = band_randint([(0, 5), (3, 12), (10, 25)])
+        critical_tickets = band_randint([(0, 1), (1, 3), (2, 5)])
+        sla_breaches = band_randint([(0, 0), (0, 1), (1, 3)])
+        nps = band_uniform([(40, 90), (0, 50), (-50, 20)])
+        # Half of healthy and 30% of moderate accounts have an expansion opportunity
+        expansion_oppty = np.where(
+            rng.random(n) < np.array([0.5, 0.3, 0.0])[band],
+            band_randint([(50_000, 500_000), (10_000, 100_000), (0, 0)]),
+            0,
+        )
+        qbr_days_ago = band_randint([(0, 60), (45, 120), (90, 180)])
+        renewal_days = rng.integers(30, 365, n, endpoint=True)
+        time_to_value = np.where(rng.random(n) > 0.3, rng.integers(7, 90, n, endpoint=True), -1)
+        onboarding = (health_profile == 4) & (rng.random(n) > 0.5)  # Some at-risk are in onboarding
+        # Renewal risk by health profile, left blank on 30% of accounts
+        renewal_risks = [
+            None, None, models.RenewalRiskEnum.LOW, models.RenewalRiskEnum.MED, models.RenewalRiskEnum.HIGH,
+        ]
+        keep_renewal_risk = rng.random(n) > 0.3
+        
+        # 30 days of daily metrics aligned with health profile, shape (accounts, days)
+        base_logins = active_users[:, None] * band_uniform([(0.65, 0.9), (0.4, 0.7), (0.2, 0.5)], per_day=True)
+        base_events = active_users[:, None] * band_uniform([(30, 60), (15, 35), (5, 20)], per_day=True)
+        feature_x_events = (base_events * feature_adoption[:, None]).astype(int)
+        session_time = band_uniform([(20, 45), (10, 25), (5, 15)], per_day=True)
+        error_count = band_randint([(0, 3), (2, 8), (5, 15)], per_day=True)
+        ticket_backlog = band_randint([(0, 5), (3, 12), (8, 20)], per_day=True)
+        today = date.today()
+        metric_dates = [today - timedelta(days=days_ago) for days_ago in range(days)]
+        
+        account_columns = {
+            "name": selected_companies,
+            "arr": arr.astype(float).tolist(),
+            "segment": [segments[i] for i in segment_idx.tolist()],
+            "industry": rng.choice(industries, n).tolist(),
+            "region": rng.choice(regions, n).tolist(),
+            "renewal_date": [today + timedelta(days=d) for d in renewal_days.tolist()],
+            "cs_owner": rng.choice(cs_owners, n).tolist(),
+            
+            # Adoption metrics
+            "active_users": active_users.tolist(),
+            "seats_purchased": seats.tolist(),
+            "feature_x_adoption": feature_adoption.tolist(),
+            "weekly_active_pct": weekly_active.tolist(),
+            "time_to_value_days": [d if d >= 0 else None for d in time_to_value.tolist()],
+            
+            # Support metrics
+            "tickets_last_30d": tickets_30d.tolist(),
+            "critical_tickets_90d": critical_tickets.tolist(),
+            "sla_breaches_90d": sla_breaches.tolist(),
+            "nps": nps.tolist(),
+            "qbr_last_date": [today - timedelta(days=d) for d in qbr_days_ago.tolist()],
+            "onboarding_phase": onboarding.tolist(),
+            
+            # Commercial
+            "expansion_oppty_dollar": expansion_oppty.astype(float).tolist(),
+            "renewal_risk": [
+                renewal_risks[p] if keep else None
+                for p, keep in zip(health_profile.tolist(), keep_renewal_risk.tolist())
+            ],
+        }
+        # Accounts and their metrics go in as two executemany INSERTs; the
+        # table was just cleared, so names map straight back to new ids
+        now = datetime.utcnow()
+        db.exec(insert(models.Account), params=[
+            {**dict(zip(account_columns, values)), "created_at": now, "updated_at": now}
+            for values in zip(*account_columns.values())
+        ])
+        ids_by_name = dict(db.exec(select(models.Account.name, models.Account.id)).all())
+        account_ids = [ids_by_name[name] for name in selected_companies]
+        
+        # Daily metric arrays flatten account by account, matching these ids and dates
+        metric_columns = {
+            "account_id": np.repeat(account_ids, days).tolist(),
+            "date": metric_dates * n,
+            "logins": base_logins.astype(int).ravel().tolist(),
+            "events": base_events.astype(int).ravel().tolist(),
+            "feature_x_events": feature_x_events.ravel().tolist(),
+            "avg_session_min": session_time.ravel().tolist(),
+            "errors": error_count.ravel().tolist(),
+            "ticket_backlog": ticket_backlog.ravel().tolist(),
+        }
+        db.exec(insert(models.AccountMetricsDaily), params=[
+            dict(zip(metric_columns, values)) for values in zip(*metric_columns.values())
+        ])
+        
+        # Calculate health scores and create snapshots in one pass; this
+        # commits the accounts and metrics with them
+        health_scoring.recompute_health_scores(db, account_ids)
+        invalidate_portfolio_cache()
         
         return schemas.CSVUploadResponse(
-            message=f"Successfully generated {accounts_created} mock accounts",
-            accounts_created=accounts_created,
+            message=f"Successfully generated {n} mock accounts",
+            accounts_created=n,
             accounts_updated=0,
-            metrics_created=metrics_created,
-            errors=errors
+            metrics_created=n * days,
         )
     
     except Exception as e:
@@ -429,8 +316,27 @@ async def generate_mock_data(
 
 # ==================== ACCOUNTS ====================
 
+def _latest_top_factors():
+    """Correlated subquery for the top_factors of an account's latest snapshot"""
+    return select(models.HealthSnapshot.top_factors).where(
+        models.HealthSnapshot.account_id == models.Account.id
+    ).order_by(models.HealthSnapshot.calculated_at.desc()).limit(1).scalar_subquery()
+
+
+def _require_account(db: Session, account_id: int) -> None:
+    """404 unless the account exists, without loading it"""
+    if db.exec(select(models.Account.id).where(models.Account.id == account_id)).first() is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+
+# Account columns returned by the account list (AccountResponse minus enrichment)
+ACCOUNT_RESPONSE_COLUMNS = [
+    name for name in schemas.AccountResponse.model_fields if name != "latest_health_factors"
+]
+
+
 @app.get("/accounts", response_model=schemas.AccountListResponse)
-async def list_accounts(
+def list_accounts(
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
     segment: Optional[str] = None,
@@ -446,7 +352,11 @@ async def list_accounts(
     - bucket: Green, Amber, Red
     - region: Any region value
     """
-    statement = select(models.Account)
+    # Response columns plus the latest snapshot's factors, one row per account
+    statement = select(
+        *(getattr(models.Account, name) for name in ACCOUNT_RESPONSE_COLUMNS),
+        _latest_top_factors().label("latest_health_factors"),
+    )
     
     # Apply filters
     if segment:
@@ -457,66 +367,54 @@ async def list_accounts(
     if region:
         statement = statement.where(models.Account.region == region)
     
-    # Get total count
-    total_statement = statement
-    total = len(db.exec(total_statement).all())
+    # Get total count without hydrating every matching account
+    total_statement = select(func.count()).select_from(
+        statement.with_only_columns(models.Account.id).subquery()
+    )
+    total = db.exec(total_statement).one()
     
     # Apply pagination
     offset = (page - 1) * page_size
     statement = statement.offset(offset).limit(page_size)
     
-    accounts = db.exec(statement).all()
-    
-    # Convert to response models
-    account_responses = []
-    for account in accounts:
-        # Get latest health snapshot
-        snapshot_stmt = select(models.HealthSnapshot).where(
-            models.HealthSnapshot.account_id == account.id
-        ).order_by(models.HealthSnapshot.calculated_at.desc()).limit(1)
-        latest_snapshot = db.exec(snapshot_stmt).first()
-        
-        account_dict = schemas.AccountResponse.model_validate(account)
-        if latest_snapshot:
-            factors = json.loads(latest_snapshot.top_factors)
-            account_dict.latest_health_factors = [
-                schemas.HealthFactor(**f) for f in factors[:5]
-            ]
-        
-        account_responses.append(account_dict)
-    
-    return schemas.AccountListResponse(
-        total=total,
-        page=page,
-        page_size=page_size,
-        accounts=account_responses
+    accounts = []
+    for row in db.exec(statement):
+        account = row._asdict()
+        if account["latest_health_factors"] is not None:
+            account["latest_health_factors"] = account["latest_health_factors"][:5]
+        accounts.append(account)
+    
+    # The rows come straight from the database, so encode them in one pass
+    # instead of validating an AccountResponse per account
+    body = {"total": total, "page": page, "page_size": page_size, "accounts": accounts}
+    return Response(
+        content=serialization.dumps(body, default=serialization.iso_default),
+        media_type="application/json",
     )
 
 
 @app.get("/accounts/{account_id}", response_model=schemas.AccountResponse)
-async def get_account(
+def get_account(
     account_id: int,
     db: Session = Depends(get_db)
 ):
     """
     Get account detail with latest health factors.
     """
-    account = db.get(models.Account, account_id)
+    # Account and its latest snapshot factors in a single round trip
+    row = db.exec(
+        select(models.Account, _latest_top_factors()).where(models.Account.id == account_id)
+    ).first()
     
-    if not account:
+    if not row:
         raise HTTPException(status_code=404, detail="Account not found")
     
-    # Get latest health snapshot
-    snapshot_stmt = select(models.HealthSnapshot).where(
-        models.HealthSnapshot.account_id == account_id
-    ).order_by(models.HealthSnapshot.calculated_at.desc()).limit(1)
-    latest_snapshot = db.exec(snapshot_stmt).first()
+    account, top_factors = row
     
     account_response = schemas.AccountResponse.model_validate(account)
-    if latest_snapshot:
-        factors = json.loads(latest_snapshot.top_factors)
+    if top_factors is not None:
         account_response.latest_health_factors = [
-            schemas.HealthFactor(**f) for f in factors
+            schemas.HealthFactor.model_construct(**f) for f in top_factors
         ]
     
     return account_response
@@ -524,15 +422,13 @@ async def get_account(
 
 # ==================== HEALTH ====================
 
-@app.post("/health/recompute", response_model=schemas.HealthRecomputeResponse)
-async def recompute_health(db: Session = Depends(get_db)):
-    """
-    Recompute health scores for all accounts with explainable factors.
-    Creates new health snapshots.
-    """
+def _recompute_health() -> schemas.HealthRecomputeResponse:
+    """Recompute every account's health score in a session of its own"""
     start_time = time.time()
     
-    accounts_updated = health_scoring.recompute_all_health_scores(db)
+    with Session(engine) as db:
+        accounts_updated = health_scoring.recompute_all_health_scores(db)
+    invalidate_portfolio_cache()
     
     computation_time = time.time() - start_time
     
@@ -544,8 +440,31 @@ async def recompute_health(db: Session = Depends(get_db)):
     )
 
 
+@app.post(
+    "/health/recompute",
+    response_model=schemas.HealthRecomputeResponse,
+    responses={202: {"model": schemas.InsightJobStatus}}
+)
+async def recompute_health(
+    background: bool = Query(False, description=BACKGROUND_QUERY_DESCRIPTION),
+):
+    """
+    Recompute health scores for all accounts with explainable factors.
+    Creates new health snapshots.
+    
+    Concurrent requests share one recompute; with ?background=true poll
+    GET /insights/jobs/{job_id} for the result.
+    """
+    key = ("health_recompute",)
+    factory = lambda: run_in_threadpool(_recompute_health)
+    if background:
+        return _job_accepted(insight_jobs.submit(key, factory))
+    
+    return await insight_jobs.run(key, factory)
+
+
 @app.get("/accounts/{account_id}/health-history", response_model=List[schemas.HealthSnapshotResponse])
-async def get_health_history(
+def get_health_history(
     account_id: int,
     limit: int = Query(30, ge=1, le=365),
     db: Session = Depends(get_db)
@@ -553,26 +472,27 @@ async def get_health_history(
     """
     Get historical health snapshots for an account.
     """
-    account = db.get(models.Account, account_id)
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
+    _require_account(db, account_id)
     
-    statement = select(models.HealthSnapshot).where(
-        models.HealthSnapshot.account_id == account_id
-    ).order_by(models.HealthSnapshot.calculated_at.desc()).limit(limit)
+    Snapshot = models.HealthSnapshot
+    statement = select(
+        Snapshot.id, Snapshot.account_id, Snapshot.calculated_at,
+        Snapshot.score, Snapshot.risk_label, Snapshot.top_factors,
+    ).where(
+        Snapshot.account_id == account_id
+    ).order_by(Snapshot.calculated_at.desc()).limit(limit)
     
     snapshots = db.exec(statement).all()
     
     result = []
     for snapshot in snapshots:
-        factors_json = json.loads(snapshot.top_factors)
         snapshot_dict = schemas.HealthSnapshotResponse(
             id=snapshot.id,
             account_id=snapshot.account_id,
             calculated_at=snapshot.calculated_at,
             score=snapshot.score,
             risk_label=snapshot.risk_label.value,
-            top_factors=[schemas.HealthFactor(**f) for f in factors_json]
+            top_factors=[schemas.HealthFactor.model_construct(**f) for f in snapshot.top_factors]
         )
         result.append(snapshot_dict)
     
@@ -580,7 +500,7 @@ async def get_health_history(
 
 
 @app.get("/accounts/{account_id}/metrics-history", response_model=List[schemas.AccountMetricsResponse])
-async def get_metrics_history(
+def get_metrics_history(
     account_id: int,
     days: int = Query(90, ge=1, le=365),
     db: Session = Depends(get_db)
@@ -588,31 +508,117 @@ async def get_metrics_history(
     """
     Get historical daily metrics for an account.
     """
-    account = db.get(models.Account, account_id)
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-    
-    statement = select(models.AccountMetricsDaily).where(
-        models.AccountMetricsDaily.account_id == account_id
-    ).order_by(models.AccountMetricsDaily.date.desc()).limit(days)
-    
-    metrics = db.exec(statement).all()
-    
-    return metrics
+    _require_account(db, account_id)
+    
+    Metrics = models.AccountMetricsDaily
+    statement = select(
+        *(getattr(Metrics, name) for name in schemas.AccountMetricsResponse.model_fields)
+    ).where(
+        Metrics.account_id == account_id
+    ).order_by(Metrics.date.desc()).limit(days)
+    
+    # Up to a year of rows: encode the row mappings in one pass instead of
+    # validating an AccountMetricsResponse per day
+    metrics = [row._asdict() for row in db.exec(statement)]
+    return Response(
+        content=serialization.dumps(metrics, default=serialization.iso_default),
+        media_type="application/json",
+    )
 
 
 # ==================== PORTFOLIO ====================
 
+# Portfolio summary cache: (data_version, expires_at, summary, etag)
+PORTFOLIO_CACHE_TTL_SECONDS = 60
+_portfolio_cache: Optional[Tuple[tuple, float, schemas.PortfolioSummary, str]] = None
+
+
+def invalidate_portfolio_cache():
+    """Drop the cached portfolio summary after writes to accounts or snapshots"""
+    global _portfolio_cache
+    _portfolio_cache = None
+
+
+def _portfolio_data_version(db: Session) -> tuple:
+    """
+    Cheap fingerprint of the data behind the portfolio summary. Today's date
+    is part of it because renewals_next_60d counts from today.
+    """
+    return tuple(db.exec(select(
+        select(func.max(models.Account.updated_at)).scalar_subquery(),
+        select(func.max(models.HealthSnapshot.calculated_at)).scalar_subquery(),
+        select(func.count(models.Account.id)).scalar_subquery(),
+    )).one()) + (datetime.now().date(),)
+
+
+def get_cached_portfolio_summary(db: Session) -> Tuple[schemas.PortfolioSummary, str]:
+    """
+    Return (summary, etag), recomputing only when the underlying data
+    changed or the TTL expired.
+    """
+    global _portfolio_cache
+    
+    version = _portfolio_data_version(db)
+    now = time.monotonic()
+    if _portfolio_cache and _portfolio_cache[0] == version and _portfolio_cache[1] > now:
+        return _portfolio_cache[2], _portfolio_cache[3]
+    
+    summary = compute_portfolio_summary(db)
+    etag = '"' + hashlib.md5(repr(version).encode()).hexdigest() + '"'
+    _portfolio_cache = (version, now + PORTFOLIO_CACHE_TTL_SECONDS, summary, etag)
+    return summary, etag
+
+
 @app.get("/portfolio/summary", response_model=schemas.PortfolioSummary)
-async def get_portfolio_summary(db: Session = Depends(get_db)):
+def get_portfolio_summary(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
     """
     Get comprehensive portfolio summary with health breakdown.
+    Supports conditional GET via ETag / If-None-Match.
     """
-    import statistics
+    summary, etag = get_cached_portfolio_summary(db)
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
     
-    accounts = db.exec(select(models.Account)).all()
+    response.headers["ETag"] = etag
+    return summary
+
+
+def compute_portfolio_summary(db: Session) -> schemas.PortfolioSummary:
+    """
+    Compute the portfolio summary from the database.
+    """
+    from datetime import timedelta
     
-    if not accounts:
+    Account = models.Account
+    today = datetime.now().date()
+    
+    # Scalar totals in one aggregate query
+    seats = case((Account.seats_purchased < 1, 1), else_=Account.seats_purchased)
+    totals = db.exec(select(
+        func.count(Account.id),
+        func.sum(Account.arr),
+        func.avg(case((Account.health_score != 0, Account.health_score))),
+        func.avg(Account.active_users * 1.0 / seats),
+        func.avg(Account.feature_x_adoption),
+        func.sum(Account.tickets_last_30d),
+        func.sum(Account.critical_tickets_90d),
+        func.sum(case((Account.renewal_date.between(today, today + timedelta(days=60)), 1), else_=0)),
+        func.sum(case((Account.health_bucket.in_([
+            models.HealthBucketEnum.AMBER, models.HealthBucketEnum.RED
+        ]), Account.arr), else_=0.0)),
+    )).one()
+    
+    (
+        total_accounts, total_arr, avg_health_score, avg_adoption_ratio, avg_feature_adoption,
+        total_tickets_30d, total_critical_90d, renewals_next_60d, at_risk_arr,
+    ) = totals
+    
+    if not total_accounts:
         return schemas.PortfolioSummary(
             total_accounts=0,
             total_arr=0.0,
@@ -630,60 +636,36 @@ async def get_portfolio_summary(db: Session = Depends(get_db)):
             at_risk_arr=0.0
         )
     
-    total_arr = sum(a.arr for a in accounts)
-    
-    # ARR breakdowns
+    # ARR breakdowns, grouped server-side
     arr_by_bucket = {}
-    arr_by_segment = {}
     accounts_by_risk = {}
-    
-    for account in accounts:
-        # By bucket
-        bucket = account.health_bucket.value if account.health_bucket else "Unknown"
-        arr_by_bucket[bucket] = arr_by_bucket.get(bucket, 0.0) + account.arr
-        accounts_by_risk[bucket] = accounts_by_risk.get(bucket, 0) + 1
-        
-        # By segment
-        segment = account.segment.value
-        arr_by_segment[segment] = arr_by_segment.get(segment, 0.0) + account.arr
+    bucket_rows = db.exec(
+        select(Account.health_bucket, func.count(Account.id), func.sum(Account.arr))
+        .group_by(Account.health_bucket)
+    ).all()
+    for bucket, count, arr in bucket_rows:
+        bucket = bucket.value if bucket else "Unknown"
+        arr_by_bucket[bucket] = arr
+        accounts_by_risk[bucket] = count
+    
+    arr_by_segment = {
+        segment.value: arr
+        for segment, arr in db.exec(
+            select(Account.segment, func.sum(Account.arr)).group_by(Account.segment)
+        ).all()
+    }
     
     # Risk breakdown percentages
-    total_accounts = len(accounts)
     risk_breakdown = {
         bucket: round(count / total_accounts * 100, 1)
         for bucket, count in accounts_by_risk.items()
     }
     
-    # Health scores
-    health_scores = [a.health_score for a in accounts if a.health_score]
-    avg_health_score = statistics.mean(health_scores) if health_scores else 0.0
-    median_health_score = statistics.median(health_scores) if health_scores else 0.0
-    
-    # Adoption metrics
-    adoption_ratios = [
-        a.active_users / max(1, a.seats_purchased)
-        for a in accounts
-    ]
-    avg_adoption_ratio = statistics.mean(adoption_ratios) if adoption_ratios else 0.0
-    
-    feature_adoptions = [a.feature_x_adoption for a in accounts]
-    avg_feature_adoption = statistics.mean(feature_adoptions) if feature_adoptions else 0.0
-    
-    # Support metrics
-    total_tickets_30d = sum(a.tickets_last_30d for a in accounts)
-    total_critical_90d = sum(a.critical_tickets_90d for a in accounts)
-    
-    # Renewal risk
-    today = datetime.now().date()
-    renewals_next_60d = sum(
-        1 for a in accounts
-        if a.renewal_date and 0 <= (a.renewal_date - today).days <= 60
-    )
-    
-    at_risk_arr = sum(
-        a.arr for a in accounts
-        if a.health_bucket and a.health_bucket in [models.HealthBucketEnum.AMBER, models.HealthBucketEnum.RED]
+    # Median needs the score column itself
+    health_scores = np.fromiter(
+        db.exec(select(Account.health_score).where(Account.health_score != 0)), dtype=np.float64
     )
+    median_health_score = float(np.median(health_scores)) if health_scores.size else 0.0
     
     return schemas.PortfolioSummary(
         total_accounts=total_accounts,
@@ -692,7 +674,7 @@ async def get_portfolio_summary(db: Session = Depends(get_db)):
         arr_by_segment={k: round(v, 2) for k, v in arr_by_segment.items()},
         risk_breakdown=risk_breakdown,
         accounts_by_risk=accounts_by_risk,
-        avg_health_score=round(avg_health_score, 2),
+        avg_health_score=round(avg_health_score or 0.0, 2),
         median_health_score=round(median_health_score, 2),
         avg_adoption_ratio=round(avg_adoption_ratio, 2),
         avg_feature_adoption=round(avg_feature_adoption, 2),
@@ -705,75 +687,249 @@ async def get_portfolio_summary(db: Session = Depends(get_db)):
 
 # ==================== AI INSIGHTS ====================
 
-@app.post("/insights/portfolio", response_model=schemas.PortfolioInsight)
+def _job_status(job: insight_jobs.InsightJob) -> schemas.InsightJobStatus:
+    return schemas.InsightJobStatus(
+        job_id=job.job_id,
+        status=job.status,
+        result=job.result,
+        error=job.error
+    )
+
+
+def _model_response(model: BaseModel) -> Response:
+    """
+    JSON response for a model built here, encoded by pydantic-core directly
+    instead of FastAPI validating it against the response_model again.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def _job_accepted(job: insight_jobs.InsightJob) -> JSONResponse:
+    """202 response pointing the client at GET /insights/jobs/{job_id}"""
+    return JSONResponse(status_code=202, content=_job_status(job).model_dump(mode="json"))
+
+
+@app.post(
+    "/insights/portfolio",
+    response_model=schemas.PortfolioInsight,
+    responses={202: {"model": schemas.InsightJobStatus}}
+)
 async def generate_portfolio_insights(
     request: Optional[schemas.InsightRequest] = None,
-    db: Session = Depends(get_db)
+    background: bool = Query(False, description=BACKGROUND_QUERY_DESCRIPTION),
+    db: Session = Depends(get_db),
+    ai_service: AIInsightsService = Depends(get_ai_service)
 ):
     """
     Generate AI-powered portfolio insights.
     """
-    # Get portfolio summary data
-    summary_response = await get_portfolio_summary(db)
+    # Get portfolio summary data (sync DB work stays off the event loop)
+    summary_response, etag = await run_in_threadpool(get_cached_portfolio_summary, db)
+    portfolio_data = summary_response.model_dump()
+    
+    # Identical requests against the same data share one OpenAI call
+    key = ("portfolio", etag)
+    factory = lambda: ai_service.generate_portfolio_insight(portfolio_data)
+    if background:
+        return _job_accepted(insight_jobs.submit(key, factory))
+    
+    insight = await insight_jobs.run(key, factory)
+    return _model_response(insight)
+
+
+@app.post("/insights/portfolio/stream")
+async def stream_portfolio_insights(
+    db: Session = Depends(get_db),
+    ai_service: AIInsightsService = Depends(get_ai_service)
+):
+    """
+    Generate AI-powered portfolio insights as Server-Sent Events. "delta"
+    events carry completion text as it is generated; a final "insight" event
+    carries the parsed PortfolioInsight.
+    """
+    summary_response, _ = await run_in_threadpool(get_cached_portfolio_summary, db)
     portfolio_data = summary_response.model_dump()
     
-    insight = await ai_service.generate_portfolio_insight(portfolio_data)
-    return insight
+    return _insight_event_stream(ai_service.generate_portfolio_insight_stream(portfolio_data))
+
+
+def _insight_event_stream(stream) -> StreamingResponse:
+    """Server-Sent Events response for an AIInsightsService insight stream"""
+    async def events():
+        async for event, payload in stream:
+            data = payload.model_dump_json() if event == "insight" else serialization.dumps(payload)
+            yield f"event: {event}\ndata: {data}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Account columns read by the insight prompts and the insight job key
+INSIGHT_ACCOUNT_COLUMNS = (
+    models.Account.id,
+    models.Account.name,
+    models.Account.segment,
+    models.Account.region,
+    models.Account.arr,
+    models.Account.health_score,
+    models.Account.health_bucket,
+    models.Account.updated_at,
+)
+
+
+def _load_accounts_risk_factors(
+    db: Session, account_ids: Optional[List[int]] = None
+) -> List[Tuple[Row, List[str], None]]:
+    """
+    Accounts (all when None), in id order, with the negative factors from
+    their latest health snapshot, in one query.
+    
+    Accounts come back as plain rows of INSIGHT_ACCOUNT_COLUMNS rather than
+    session-bound Account entities: insight jobs read them after the request
+    session has closed.
+    """
+    statement = select(
+        *INSIGHT_ACCOUNT_COLUMNS, _latest_top_factors().label("top_factors")
+    ).order_by(models.Account.id)
+    if account_ids is not None:
+        statement = statement.where(models.Account.id.in_(account_ids))
+    
+    items = []
+    for account in db.exec(statement):
+        # Get negative impact factors as risks
+        risk_factors = [f['factor'] for f in account.top_factors or [] if f['impact'] < 0]
+        items.append((account, risk_factors, None))
+    return items
+
+
+def _load_account_risk_factors(db: Session, account_id: int) -> Tuple[Row, List[str]]:
+    """Load an account and the negative factors from its latest health snapshot."""
+    items = _load_accounts_risk_factors(db, [account_id])
+    if not items:
+        raise HTTPException(status_code=404, detail="Account not found")
+    
+    account, risk_factors, _ = items[0]
+    return account, risk_factors
 
 
-@app.post("/insights/account/{account_id}", response_model=schemas.AccountInsight)
+@app.post(
+    "/insights/account/{account_id}",
+    response_model=schemas.AccountInsight,
+    responses={202: {"model": schemas.InsightJobStatus}}
+)
 async def generate_account_insights(
     account_id: int,
     request: Optional[schemas.InsightRequest] = None,
-    db: Session = Depends(get_db)
+    background: bool = Query(False, description=BACKGROUND_QUERY_DESCRIPTION),
+    db: Session = Depends(get_db),
+    ai_service: AIInsightsService = Depends(get_ai_service)
 ):
     """
     Generate AI-powered account insights with 3 recommended actions.
     Uses latest health snapshot for explainable risk factors.
     """
-    account = db.get(models.Account, account_id)
-    
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-    
-    # Get latest health snapshot with factors
-    snapshot_stmt = select(models.HealthSnapshot).where(
-        models.HealthSnapshot.account_id == account_id
-    ).order_by(models.HealthSnapshot.calculated_at.desc()).limit(1)
-    latest_snapshot = db.exec(snapshot_stmt).first()
-    
-    risk_factors = []
-    if latest_snapshot:
-        factors_json = json.loads(latest_snapshot.top_factors)
-        # Get negative impact factors as risks
-        risk_factors = [
-            f['factor'] for f in factors_json if f['impact'] < 0
-        ]
+    account, risk_factors = await run_in_threadpool(_load_account_risk_factors, db, account_id)
     
     # Generate AI insights
-    insight = await ai_service.generate_account_insight(
+    key = ("account", account_id, account.updated_at, account.health_score, tuple(risk_factors))
+    factory = lambda: ai_service.generate_account_insight(
         account,
         risk_factors,
         None,  # metrics
         None   # trend data
     )
+    if background:
+        return _job_accepted(insight_jobs.submit(key, factory))
+    
+    insight = await insight_jobs.run(key, factory)
+    return _model_response(insight)
+
+
+@app.post("/insights/account/{account_id}/stream")
+async def stream_account_insights(
+    account_id: int,
+    db: Session = Depends(get_db),
+    ai_service: AIInsightsService = Depends(get_ai_service)
+):
+    """
+    Generate AI-powered account insights as Server-Sent Events, like
+    /insights/portfolio/stream; the final "insight" event carries the
+    parsed AccountInsight.
+    """
+    account, risk_factors = await run_in_threadpool(_load_account_risk_factors, db, account_id)
+    
+    return _insight_event_stream(ai_service.generate_account_insight_stream(account, risk_factors, None))
+
+
+@app.post("/insights/accounts", response_model=List[schemas.AccountInsight])
+async def generate_account_insights_batch(
+    request: schemas.AccountInsightsBatchRequest,
+    batched: bool = Query(True, description="Pack accounts into shared OpenAI requests instead of one request each"),
+    db: Session = Depends(get_db),
+    ai_service: AIInsightsService = Depends(get_ai_service)
+):
+    """
+    Generate AI-powered insights for several accounts. By default accounts are
+    batched into as few OpenAI requests as possible; with batched=false each
+    account gets its own concurrent request, reusing any cached single-account
+    insight. Results follow the order of account_ids.
+    """
+    def load_items():
+        account_ids = list(dict.fromkeys(request.account_ids))
+        by_id = {item[0].id: item for item in _load_accounts_risk_factors(db, account_ids)}
+        if len(by_id) < len(account_ids):
+            raise HTTPException(status_code=404, detail="Account not found")
+        return [by_id[account_id] for account_id in account_ids]
+    
+    items = await run_in_threadpool(load_items)
+    if batched:
+        insights = await ai_service.generate_account_insights_batch(items)
+    else:
+        insights = await ai_service.generate_account_insights_bulk(items)
+    by_id = {insight.account_id: insight for insight in insights}
+    return [by_id[account_id] for account_id in request.account_ids]
+
+
+@app.get("/insights/jobs/{job_id}", response_model=schemas.InsightJobStatus)
+def get_insight_job(job_id: str):
+    """
+    Poll a background insight job started with ?background=true.
     
-    return insight
+    Jobs are held in memory by the process that started them, so this
+    returns 404 when the poll reaches a different process (another uvicorn
+    worker or Lambda instance), after a restart, or once the job has been
+    evicted.
+    """
+    job = insight_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Insight job not found")
+    
+    return _job_status(job)
 
 
 # ==================== PLAYBOOKS ====================
 
 @app.get("/playbooks", response_model=List[schemas.Playbook])
-async def get_playbooks():
+def get_playbooks(request: Request):
     """
     Get all available playbooks from the library.
+    The library is static, so the body is serialized once and supports
+    conditional GET via ETag / If-None-Match.
     """
     from . import playbooks
-    return playbooks.get_all_playbooks()
+    body, etag = playbooks.get_all_playbooks_json()
+    
+    headers = {"ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.post("/actions/recommend", response_model=schemas.PlaybookRecommendations)
-async def recommend_actions(
+def recommend_actions(
     account_id: Optional[int] = None,
     risk_factors: Optional[List[str]] = None,
     db: Session = Depends(get_db)
@@ -787,31 +943,22 @@ async def recommend_actions(
     from . import playbooks
     
     if account_id:
-        # Get account and latest health snapshot
-        account = db.get(models.Account, account_id)
-        if not account:
+        # Latest health snapshot factors only; the account itself isn't needed
+        row = db.exec(
+            select(models.Account.id, _latest_top_factors()).where(models.Account.id == account_id)
+        ).first()
+        if not row:
             raise HTTPException(status_code=404, detail="Account not found")
         
-        snapshot_stmt = select(models.HealthSnapshot).where(
-            models.HealthSnapshot.account_id == account_id
-        ).order_by(models.HealthSnapshot.calculated_at.desc()).limit(1)
-        latest_snapshot = db.exec(snapshot_stmt).first()
-        
-        if latest_snapshot:
-            factors_json = json.loads(latest_snapshot.top_factors)
-            # Get negative impact factors
-            risk_factors = [
-                f['factor'] for f in factors_json if f['impact'] < 0
-            ]
-        else:
-            risk_factors = []
+        # Get negative impact factors
+        risk_factors = [f['factor'] for f in row[1] or [] if f['impact'] < 0]
     
     if not risk_factors:
         risk_factors = []
     
     recommendations = playbooks.recommend_playbooks(risk_factors)
     
-    return schemas.PlaybookRecommendations(
+    return _model_response(schemas.PlaybookRecommendations.model_construct(
         account_id=account_id,
         recommendations=recommendations
-    )
+    ))
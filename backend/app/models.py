@@ -1,4 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import JSON, Column, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from typing import Optional, List
 from datetime import datetime
 from datetime import date as date_type
@@ -78,6 +80,12 @@ class AccountMetricsDaily(SQLModel, table=True):
     Daily activity metrics per account
     """
     __tablename__ = "account_metrics_daily"
+    __table_args__ = (
+        # One row per account per day. Serves account_id + date range / latest
+        # lookups (scanned backwards for ORDER BY date DESC) and lets bulk
+        # loads skip duplicates with ON CONFLICT.
+        Index("ix_metrics_account_date", "account_id", "date", unique=True),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     account_id: int = Field(foreign_key="accounts.id", index=True)
@@ -93,10 +101,6 @@ class AccountMetricsDaily(SQLModel, table=True):
     
     # Relationship
     account: Optional[Account] = Relationship(back_populates="daily_metrics")
-    
-    class Config:
-        # Unique constraint on account_id + date
-        table_args = {"sqlite_autoincrement": True}
 
 
 class HealthSnapshot(SQLModel, table=True):
@@ -104,6 +108,11 @@ class HealthSnapshot(SQLModel, table=True):
     Historical health score snapshots with explainable factors
     """
     __tablename__ = "health_snapshots"
+    __table_args__ = (
+        # Serves per-account history and latest-snapshot lookups (scanned
+        # backwards for ORDER BY calculated_at DESC) without a sort.
+        Index("ix_snapshots_account_calculated", "account_id", "calculated_at"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     account_id: int = Field(foreign_key="accounts.id", index=True)
@@ -111,7 +120,22 @@ class HealthSnapshot(SQLModel, table=True):
     
     score: float = Field(ge=0, le=110)  # 0-100 + up to 10 bonus
     risk_label: HealthBucketEnum
-    top_factors: str = Field(default="[]")  # JSON array of {factor, impact}
+    # [{factor, impact}]; JSONB on Postgres, JSON text elsewhere
+    top_factors: List[dict] = Field(
+        default_factory=list,
+        sa_column=Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+    )
     
     # Relationship
     account: Optional[Account] = Relationship(back_populates="health_snapshots")
+
+
+class CompletionCacheEntry(SQLModel, table=True):
+    """
+    Parsed OpenAI response shared across processes and cold starts
+    """
+    __tablename__ = "completion_cache"
+    
+    key: str = Field(primary_key=True, max_length=32)  # prompt fingerprint
+    response: str  # JSON object returned by the model
+    expires_at: datetime = Field(index=True)
@@ -1,7 +1,10 @@
-from typing import List
+import hashlib
+from functools import lru_cache
+from typing import Dict, List, Tuple
 import json
 from . import models
 from . import schemas
+from . import serialization
 
 # Predefined playbooks library
 PLAYBOOKS_LIBRARY = [
@@ -187,63 +190,112 @@ PLAYBOOKS_LIBRARY = [
 ]
 
 
+def _build_playbook(p: dict) -> schemas.Playbook:
+    return schemas.Playbook(
+        id=p["id"],
+        title=p["title"],
+        description=p["description"],
+        category=p["category"],
+        priority=p["priority"],
+        estimated_effort=p["estimated_effort"],
+        risk_factors=p["risk_factors"],
+        steps=p["steps"],
+        created_at=None  # type: ignore
+    )
+
+
+# The library is static, so validate each playbook model once at import
+_PLAYBOOKS = [_build_playbook(p) for p in PLAYBOOKS_LIBRARY]
+
+
+def _index_playbook_factors() -> Dict[str, Tuple[int, ...]]:
+    """Map each lowercased playbook risk factor to the positions of the playbooks listing it"""
+    index: Dict[str, List[int]] = {}
+    for pos, playbook_data in enumerate(PLAYBOOKS_LIBRARY):
+        for prf in playbook_data["risk_factors"]:
+            index.setdefault(prf.lower(), []).append(pos)
+    return {phrase: tuple(positions) for phrase, positions in index.items()}
+
+
+# Inverted index, so each incoming factor is checked against every distinct
+# phrase once rather than against every playbook's list
+_PLAYBOOKS_BY_FACTOR = _index_playbook_factors()
+
+# Relevance boost by playbook priority, resolved per playbook position
+_PRIORITY_BOOST = {"High": 0.2, "Medium": 0.1, "Low": 0.0}
+_PLAYBOOK_BOOSTS = tuple(_PRIORITY_BOOST.get(p["priority"], 0) for p in PLAYBOOKS_LIBRARY)
+
+
 def get_all_playbooks() -> List[schemas.Playbook]:
     """Get all available playbooks"""
-    return [
-        schemas.Playbook(
-            id=p["id"],
-            title=p["title"],
-            description=p["description"],
-            category=p["category"],
-            priority=p["priority"],
-            estimated_effort=p["estimated_effort"],
-            risk_factors=p["risk_factors"],
-            steps=p["steps"],
-            created_at=None  # type: ignore
-        )
-        for p in PLAYBOOKS_LIBRARY
-    ]
+    return list(_PLAYBOOKS)
 
 
-def recommend_playbooks(risk_factors: List[str], top_n: int = 5) -> List[schemas.PlaybookRecommendation]:
-    """Recommend playbooks based on risk factors"""
+@lru_cache(maxsize=1)
+def get_all_playbooks_json() -> Tuple[str, str]:
+    """All playbooks as (JSON body, ETag), serialized once per process"""
+    body = serialization.dumps([p.model_dump(mode="json") for p in _PLAYBOOKS])
+    return body, '"' + hashlib.md5(body.encode()).hexdigest() + '"'
+
+
+@lru_cache(maxsize=128)
+def _recommend_cached(
+    risk_factors: Tuple[str, ...], top_n: int
+) -> Tuple[Tuple[int, float, Tuple[str, ...]], ...]:
+    """
+    Match playbooks for one risk-factor tuple, as immutable
+    (playbook position, relevance score, matching factors) entries.
+
+    Risk factors come from a small fixed vocabulary, so the same inputs
+    recur constantly. Rebuild _PLAYBOOKS, _PLAYBOOKS_BY_FACTOR and
+    _PLAYBOOK_BOOSTS and call `_recommend_cached.cache_clear()` if
+    PLAYBOOKS_LIBRARY is ever modified at runtime.
+    """
+    # Matching factors per playbook position, in incoming order
+    matches: Dict[int, List[str]] = {}
+    for rf in risk_factors:
+        rf_lower = rf.lower()
+        positions = {
+            pos
+            for phrase, phrase_positions in _PLAYBOOKS_BY_FACTOR.items() if phrase in rf_lower
+            for pos in phrase_positions
+        }
+        for pos in positions:
+            matches.setdefault(pos, []).append(rf)
+    
     recommendations = []
     
-    for playbook_data in PLAYBOOKS_LIBRARY:
+    # Library order, so equal scores keep their order through the stable sort
+    for pos in sorted(matches):
+        matching_factors = matches[pos]
+        
         # Calculate relevance score
-        matching_factors = [
-            rf for rf in risk_factors
-            if any(prf.lower() in rf.lower() for prf in playbook_data["risk_factors"])
-        ]
+        relevance_score = len(matching_factors) / len(risk_factors)
+        
+        # Boost score based on priority
+        relevance_score += _PLAYBOOK_BOOSTS[pos]
         
-        if matching_factors:
-            relevance_score = len(matching_factors) / len(risk_factors) if risk_factors else 0
-            
-            # Boost score based on priority
-            priority_boost = {"High": 0.2, "Medium": 0.1, "Low": 0.0}
-            relevance_score += priority_boost.get(playbook_data["priority"], 0)
-            
-            playbook = schemas.Playbook(
-                id=playbook_data["id"],
-                title=playbook_data["title"],
-                description=playbook_data["description"],
-                category=playbook_data["category"],
-                priority=playbook_data["priority"],
-                estimated_effort=playbook_data["estimated_effort"],
-                risk_factors=playbook_data["risk_factors"],
-                steps=playbook_data["steps"],
-                created_at=None  # type: ignore
-            )
-            
-            recommendations.append(
-                schemas.PlaybookRecommendation(
-                    playbook=playbook,
-                    relevance_score=round(min(1.0, relevance_score), 2),
-                    matching_risk_factors=matching_factors
-                )
-            )
+        recommendations.append((pos, round(min(1.0, relevance_score), 2), tuple(matching_factors)))
     
     # Sort by relevance score
-    recommendations.sort(key=lambda x: x.relevance_score, reverse=True)
+    recommendations.sort(key=lambda x: x[1], reverse=True)
+    
+    return tuple(recommendations[:top_n])
+
+
+def recommend_playbooks(risk_factors: List[str], top_n: int = 5) -> List[schemas.PlaybookRecommendation]:
+    """Recommend playbooks based on risk factors"""
+    if not risk_factors:
+        return []
     
-    return recommendations[:top_n]
+    # Keyed on the ordered tuple: order and repeats affect the matched list and score.
+    # The cache holds plain tuples; every call gets models of its own.
+    # Built from validated playbooks and our own scores, so skip validation.
+    return [
+        schemas.PlaybookRecommendation.model_construct(
+            playbook=_PLAYBOOKS[pos].model_copy(deep=True),
+            relevance_score=relevance_score,
+            matching_risk_factors=list(matching_factors)
+        )
+        for pos, relevance_score, matching_factors in _recommend_cached(tuple(risk_factors), top_n)
+    ]
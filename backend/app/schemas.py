@@ -2,7 +2,7 @@
 Pydantic schemas for API request/response validation.
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import date, datetime
 
 
@@ -159,6 +159,11 @@ class InsightRequest(BaseModel):
     focus_areas: Optional[List[str]] = None
 
 
+class AccountInsightsBatchRequest(BaseModel):
+    """Request for AI insights on several accounts at once"""
+    account_ids: List[int] = Field(..., min_length=1, max_length=200)
+
+
 class PortfolioInsight(BaseModel):
     """AI-generated portfolio insights"""
     summary: str
@@ -188,6 +193,14 @@ class AccountInsight(BaseModel):
     generated_at: datetime
 
 
+class InsightJobStatus(BaseModel):
+    """Status of a background insight generation (or health recompute) job"""
+    job_id: str
+    status: str  # pending, completed, failed
+    result: Optional[Union[PortfolioInsight, AccountInsight, "HealthRecomputeResponse"]] = None
+    error: Optional[str] = None
+
+
 # ==================== Playbook Schemas ====================
 
 class PlaybookBase(BaseModel):
@@ -239,3 +252,7 @@ class HealthRecomputeResponse(BaseModel):
     accounts_updated: int
     snapshots_created: int
     computation_time_seconds: float
+
+
+# Resolve forward references to schemas defined further down
+InsightJobStatus.model_rebuild()
@@ -0,0 +1,43 @@
+"""
+JSON helpers for the hot paths.
+
+Uses orjson (Rust, ~3x faster loads and ~10x faster dumps) when it is
+installed and falls back to the standard library otherwise.
+"""
+import json
+from datetime import date, datetime, time
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so this catches both
+JSONDecodeError = json.JSONDecodeError
+
+
+def dumps(obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = str) -> str:
+    """Serialize to a JSON string: compact by default, or indented by two spaces."""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, default=default, option=option).decode()
+    if indent:
+        return json.dumps(obj, indent=2, default=default)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=default)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse a JSON document from str or bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iso_default(obj: Any) -> str:
+    """dumps() default writing dates and times as ISO 8601, as orjson and pydantic do."""
+    if isinstance(obj, (date, datetime, time)):
+        return obj.isoformat()
+    return str(obj)
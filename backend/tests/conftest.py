@@ -0,0 +1,36 @@
+"""
+Shared test fixtures. Every test gets a freshly created SQLite database and
+runs without an OpenAI key.
+"""
+import os
+import tempfile
+
+# Configure the app before app.database builds its engine
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ.pop("OPENAI_API_KEY", None)
+
+import pytest
+from sqlmodel import Session, SQLModel
+
+from app import models  # noqa: F401  (registers the tables)
+from app.database import engine, init_db
+
+
+@pytest.fixture
+def db():
+    """Session on an empty database"""
+    SQLModel.metadata.drop_all(engine)
+    init_db()
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def client(db):
+    """API client on an empty database"""
+    from fastapi.testclient import TestClient
+    from app.main import app, invalidate_portfolio_cache
+
+    invalidate_portfolio_cache()
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,345 @@
+"""
+AIInsightsService internals, exercised without an OpenAI client.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import select
+
+from app import ai_service, models
+from app.ai_service import AIInsightsService
+
+
+# ==================== Completion cache ====================
+
+@pytest.fixture
+def service_factory(db, monkeypatch):
+    """Build services whose OpenAI round trip is a counted stub"""
+    calls = []
+
+    async def fake_request_json(self, kind, system_prompt, prompt, max_tokens, response_schema):
+        calls.append(prompt)
+        return {"summary": prompt}
+
+    monkeypatch.setattr(AIInsightsService, "_request_json", fake_request_json)
+
+    def make():
+        return AIInsightsService()
+    make.calls = calls
+    return make
+
+
+def _complete(service: AIInsightsService, prompt: str = "prompt") -> dict:
+    return asyncio.run(service._complete_json(
+        "account", "system", prompt, 100, ai_service.ACCOUNT_RESPONSE_SCHEMA
+    ))
+
+
+def test_cached_hit_skips_api_call(service_factory):
+    service = service_factory()
+    assert _complete(service) == {"summary": "prompt"}
+    assert _complete(service) == {"summary": "prompt"}
+    assert service_factory.calls == ["prompt"]
+
+    _complete(service, "other prompt")
+    assert service_factory.calls == ["prompt", "other prompt"]
+
+
+def test_concurrent_identical_requests_share_one_call(service_factory):
+    service = service_factory()
+
+    async def main():
+        return await asyncio.gather(*(
+            service._complete_json("account", "system", "prompt", 100, ai_service.ACCOUNT_RESPONSE_SCHEMA)
+            for _ in range(3)
+        ))
+
+    assert asyncio.run(main()) == [{"summary": "prompt"}] * 3
+    assert service_factory.calls == ["prompt"]
+
+
+def test_cache_is_shared_across_event_loops(service_factory, monkeypatch):
+    service = service_factory()
+    monkeypatch.setattr(ai_service, "INSIGHT_CACHE_DB_TTL_SECONDS", 0)
+
+    # Each asyncio.run is a new loop; the result cached by the first is
+    # plain data the second can use
+    assert _complete(service) == {"summary": "prompt"}
+    assert _complete(service) == {"summary": "prompt"}
+    assert service_factory.calls == ["prompt"]
+
+
+def test_request_in_flight_on_another_loop_is_not_awaited(db, monkeypatch):
+    monkeypatch.setattr(ai_service, "INSIGHT_CACHE_DB_TTL_SECONDS", 0)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    async def request_json(self, kind, system_prompt, prompt, max_tokens, response_schema):
+        calls.append(prompt)
+        if len(calls) == 1:
+            started.set()
+            while not release.is_set():
+                await asyncio.sleep(0.01)
+        return {"summary": prompt}
+
+    monkeypatch.setattr(AIInsightsService, "_request_json", request_json)
+    service = AIInsightsService()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(_complete, service)
+        try:
+            assert started.wait(5)
+            # The first loop's task is still pending; this loop makes its own call
+            second = asyncio.run(asyncio.wait_for(service._complete_json(
+                "account", "system", "prompt", 100, ai_service.ACCOUNT_RESPONSE_SCHEMA
+            ), timeout=5))
+        finally:
+            release.set()
+        assert second == first.result(5) == {"summary": "prompt"}
+    assert len(calls) == 2
+
+
+def test_failed_request_is_not_cached_and_does_not_poison_the_next_loop(db, monkeypatch):
+    calls = []
+
+    async def flaky_request_json(self, kind, system_prompt, prompt, max_tokens, response_schema):
+        calls.append(prompt)
+        if len(calls) == 1:
+            raise RuntimeError("OpenAI unavailable")
+        return {"summary": prompt}
+
+    monkeypatch.setattr(AIInsightsService, "_request_json", flaky_request_json)
+    service = AIInsightsService()
+    with pytest.raises(RuntimeError):
+        _complete(service)
+    assert _complete(service) == {"summary": "prompt"}
+    assert len(calls) == 2
+
+
+def test_stored_response_survives_a_new_process(service_factory):
+    _complete(service_factory())
+
+    # A fresh service has an empty in-process cache but finds the stored row
+    assert _complete(service_factory()) == {"summary": "prompt"}
+    assert service_factory.calls == ["prompt"]
+
+
+def test_expired_stored_response_is_refetched(db, service_factory):
+    _complete(service_factory())
+    entry = db.exec(select(models.CompletionCacheEntry)).one()
+    entry.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.add(entry)
+    db.commit()
+
+    _complete(service_factory())
+    assert service_factory.calls == ["prompt", "prompt"]
+
+
+def test_expired_rows_are_pruned_at_most_once_per_interval(db, service_factory):
+    db.add(models.CompletionCacheEntry(
+        key="stale", response="{}", expires_at=datetime.utcnow() - timedelta(seconds=1)
+    ))
+    db.commit()
+    service = service_factory()
+
+    service._store_response("first", {})
+    assert db.get(models.CompletionCacheEntry, "stale") is None
+
+    db.add(models.CompletionCacheEntry(
+        key="stale", response="{}", expires_at=datetime.utcnow() - timedelta(seconds=1)
+    ))
+    db.commit()
+    service._store_response("second", {})
+    db.expire_all()
+    assert db.get(models.CompletionCacheEntry, "stale") is not None
+
+
+# ==================== Rate limiter ====================
+
+class FakeClock:
+    """Stands in for time.monotonic and asyncio.sleep; sleeping advances it"""
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ai_service.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(ai_service.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def test_request_bucket_allows_a_burst_then_spaces_requests(clock):
+    limiter = ai_service._RateLimiter(requests_per_minute=3, tokens_per_minute=0)
+
+    async def main():
+        for _ in range(4):
+            await limiter.acquire(100)
+
+    asyncio.run(main())
+    # Three fit in the full bucket; the fourth waits for one request to refill
+    assert clock.sleeps == [pytest.approx(20.0)]
+
+
+def test_token_bucket_waits_for_the_missing_tokens(clock):
+    limiter = ai_service._RateLimiter(requests_per_minute=0, tokens_per_minute=1000)
+
+    async def main():
+        await limiter.acquire(600)
+        await limiter.acquire(600)
+
+    asyncio.run(main())
+    assert clock.sleeps == [pytest.approx(12.0)]  # 200 tokens at 1000/min
+
+
+def test_refill_is_proportional_and_capped(clock):
+    limiter = ai_service._RateLimiter(requests_per_minute=0, tokens_per_minute=1000)
+
+    async def main():
+        await limiter.acquire(1000)
+        clock.now += 30
+        await limiter.acquire(500)  # half a minute refilled half the bucket
+        clock.now += 3600
+        await limiter.acquire(1000)  # an hour idle still only fills the bucket
+        await limiter.acquire(1)
+
+    asyncio.run(main())
+    assert clock.sleeps == [pytest.approx(0.06)]
+
+
+def test_oversized_request_is_capped_to_the_bucket(clock):
+    limiter = ai_service._RateLimiter(requests_per_minute=0, tokens_per_minute=1000)
+    asyncio.run(limiter.acquire(5000))
+    assert clock.sleeps == []
+
+
+def test_settle_returns_unused_tokens(clock):
+    limiter = ai_service._RateLimiter(requests_per_minute=0, tokens_per_minute=1000)
+
+    async def main():
+        await limiter.acquire(1000)
+        limiter.settle(estimated_tokens=1000, used_tokens=200)
+        await limiter.acquire(800)
+
+    asyncio.run(main())
+    assert clock.sleeps == []
+
+
+def test_zero_limits_never_wait(clock):
+    limiter = ai_service._RateLimiter(requests_per_minute=0, tokens_per_minute=0)
+
+    async def main():
+        for _ in range(100):
+            await limiter.acquire(10_000)
+
+    asyncio.run(main())
+    assert clock.sleeps == []
+
+
+def test_limiter_is_shared_across_event_loops(clock):
+    limiter = ai_service._RateLimiter(requests_per_minute=2, tokens_per_minute=0)
+    asyncio.run(limiter.acquire(1))
+    asyncio.run(limiter.acquire(1))
+    asyncio.run(limiter.acquire(1))
+    assert clock.sleeps == [pytest.approx(30.0)]
+
+
+# ==================== Circuit breaker ====================
+
+def _tripped_breaker(threshold: int = 3, reset_after: float = 30) -> ai_service._CircuitBreaker:
+    breaker = ai_service._CircuitBreaker(threshold, reset_after)
+    for _ in range(threshold):
+        breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_after_threshold_consecutive_failures(clock):
+    breaker = ai_service._CircuitBreaker(threshold=3, reset_after=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # resets the streak
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+
+def test_breaker_lets_one_trial_through_when_half_open(clock):
+    breaker = _tripped_breaker()
+    clock.now += 29
+    assert not breaker.allow_request()
+
+    clock.now += 1
+    assert breaker.allow_request()
+    # Other callers wait out another period while the trial runs
+    assert not breaker.allow_request()
+    clock.now += 29
+    assert not breaker.allow_request()
+
+
+def test_failed_trial_reopens_for_another_period(clock):
+    breaker = _tripped_breaker()
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    clock.now += 29
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+
+
+def test_successful_trial_closes_the_breaker(clock):
+    breaker = _tripped_breaker()
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert all(breaker.allow_request() for _ in range(5))
+
+    # A new streak is needed to open it again
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow_request()
+
+
+def test_half_open_admits_one_trial_across_threads(clock):
+    breaker = _tripped_breaker()
+    clock.now += 30
+    barrier = threading.Barrier(8)
+
+    def attempt():
+        barrier.wait()
+        return breaker.allow_request()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: attempt(), range(8)))
+    assert results.count(True) == 1
+
+
+def test_open_breaker_skips_the_api_call(db, monkeypatch):
+    service = AIInsightsService()
+    service._circuit_breaker = _tripped_breaker()
+
+    async def no_stream(*args, **kwargs):
+        raise AssertionError("OpenAI was called while the circuit is open")
+        yield
+
+    monkeypatch.setattr(service, "_stream_content", no_stream)
+    with pytest.raises(ai_service.CircuitOpenError):
+        asyncio.run(service._request_json(
+            "account", "system", "prompt", 100, ai_service.ACCOUNT_RESPONSE_SCHEMA
+        ))
@@ -0,0 +1,246 @@
+"""
+API round trips through the test client. Endpoints that encode rows
+directly must serve exactly what their declared response_model would.
+"""
+import json
+import time
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from app import models, schemas
+from app.ai_service import AIInsightsService, get_ai_service
+from app.main import app
+
+SPARSE_CSV = (
+    "name,arr,segment,region,date,logins\n"
+    "Sparse Co,1000,SMB,,2025-01-01,3\n"
+)
+
+
+@pytest.fixture
+def accounts(client):
+    """Mock portfolio plus one account with every optional field blank"""
+    assert client.post("/ingest/generate-mock?count=8").status_code == 200
+    files = {"file": ("sparse.csv", SPARSE_CSV, "text/csv")}
+    assert client.post("/ingest/csv", files=files).status_code == 200
+    return client.get("/accounts?page_size=100").json()["accounts"]
+
+
+def test_account_list_matches_account_response(client, accounts):
+    payload = client.get("/accounts?page_size=100").json()
+    validated = schemas.AccountListResponse.model_validate(payload)
+    assert validated.model_dump(mode="json") == payload
+    assert payload["total"] == len(payload["accounts"]) == 9
+
+    # Same fields and values as the detail endpoint, which validates
+    for account in payload["accounts"]:
+        detail = client.get(f"/accounts/{account['id']}").json()
+        if detail["latest_health_factors"] is not None:
+            detail["latest_health_factors"] = detail["latest_health_factors"][:5]
+        assert account == detail
+
+
+def test_account_list_filters_and_pages(client, accounts):
+    payload = client.get("/accounts?segment=SMB&page_size=100").json()
+    assert all(a["segment"] == "SMB" for a in payload["accounts"])
+    assert payload["total"] == len(payload["accounts"])
+
+    page = client.get("/accounts?page=2&page_size=5").json()
+    assert (page["total"], len(page["accounts"])) == (9, 4)
+
+
+def test_metrics_history_matches_account_metrics_response(client, accounts):
+    adapter = TypeAdapter(List[schemas.AccountMetricsResponse])
+    for account in accounts:
+        payload = client.get(f"/accounts/{account['id']}/metrics-history?days=10").json()
+        assert payload, account["name"]
+        assert adapter.dump_python(adapter.validate_python(payload), mode="json") == payload
+        dates = [row["date"] for row in payload]
+        assert dates == sorted(dates, reverse=True) and len(dates) <= 10
+
+
+def test_metrics_history_of_missing_account_is_404(client):
+    assert client.get("/accounts/999/metrics-history").status_code == 404
+
+
+def test_portfolio_summary_totals(client, db):
+    Bucket = models.HealthBucketEnum
+    for name, arr, segment, score, bucket in [
+        ("Green Ent", 100000, models.SegmentEnum.ENT, 80.0, Bucket.GREEN),
+        ("Green SMB", 10000, models.SegmentEnum.SMB, 90.0, Bucket.GREEN),
+        ("Amber SMB", 50000, models.SegmentEnum.SMB, 60.0, Bucket.AMBER),
+        ("Red Ent", 25000, models.SegmentEnum.ENT, 40.0, Bucket.RED),
+    ]:
+        db.add(models.Account(
+            name=name, arr=arr, segment=segment, health_score=score, health_bucket=bucket
+        ))
+    db.commit()
+
+    summary = client.get("/portfolio/summary").json()
+    assert (summary["total_accounts"], summary["total_arr"]) == (4, 185000.0)
+    assert summary["accounts_by_risk"] == {"Green": 2, "Amber": 1, "Red": 1}
+    assert summary["arr_by_bucket"] == {"Green": 110000.0, "Amber": 50000.0, "Red": 25000.0}
+    assert summary["arr_by_segment"] == {"Enterprise": 125000.0, "SMB": 60000.0}
+    assert summary["risk_breakdown"] == {"Green": 50.0, "Amber": 25.0, "Red": 25.0}
+    assert (summary["avg_health_score"], summary["median_health_score"]) == (67.5, 70.0)
+    assert summary["at_risk_arr"] == 75000.0
+
+
+def test_empty_portfolio_summary(client):
+    summary = client.get("/portfolio/summary").json()
+    assert (summary["total_accounts"], summary["total_arr"], summary["accounts_by_risk"]) == (0, 0.0, {})
+
+
+def test_portfolio_summary_etag_changes_with_the_data(client, accounts):
+    first = client.get("/portfolio/summary")
+    etag = first.headers["etag"]
+
+    cached = client.get("/portfolio/summary", headers={"If-None-Match": etag})
+    assert (cached.status_code, cached.headers["etag"], cached.content) == (304, etag, b"")
+
+    # A recompute writes new snapshots, so the old ETag no longer matches
+    assert client.post("/health/recompute").status_code == 200
+    recomputed = client.get("/portfolio/summary", headers={"If-None-Match": etag})
+    assert recomputed.status_code == 200
+    assert recomputed.headers["etag"] != etag
+
+    # So does an upload
+    etag = recomputed.headers["etag"]
+    files = {"file": ("more.csv", "name,arr,segment\nNew Co,5000,SMB\n", "text/csv")}
+    assert client.post("/ingest/csv", files=files).status_code == 200
+    uploaded = client.get("/portfolio/summary", headers={"If-None-Match": etag})
+    assert uploaded.status_code == 200
+    assert uploaded.headers["etag"] != etag
+    assert uploaded.json()["total_accounts"] == first.json()["total_accounts"] + 1
+
+
+def test_portfolio_insight_matches_portfolio_insight(client, accounts):
+    response = client.post("/insights/portfolio")
+    assert (response.status_code, response.headers["content-type"]) == (200, "application/json")
+    payload = response.json()
+    assert schemas.PortfolioInsight.model_validate(payload).model_dump(mode="json") == payload
+
+
+def test_background_account_insight_outlives_the_request_session(client, accounts):
+    account = accounts[0]
+    job = client.post(f"/insights/account/{account['id']}?background=true")
+    assert job.status_code == 202
+
+    for _ in range(50):
+        status = client.get(f"/insights/jobs/{job.json()['job_id']}").json()
+        if status["status"] != "pending":
+            break
+        time.sleep(0.05)
+    assert status["status"] == "completed", status["error"]
+    assert status["result"]["account_name"] == account["name"]
+
+
+# ==================== Streaming insights ====================
+
+class FakeStreamingClient:
+    """Stands in for AsyncOpenAI: chat completions stream `content` in pieces"""
+    def __init__(self, content: str, pieces: int = 4):
+        step = -(-len(content) // pieces)
+        self.pieces = [content[i:i + step] for i in range(0, len(content), step)]
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **params):
+        self.requests.append(params)
+        return self.chunks()
+
+    async def chunks(self):
+        for piece in self.pieces:
+            delta = SimpleNamespace(content=piece)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        # The final usage chunk carries no choices
+        yield SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=42))
+
+
+@pytest.fixture
+def streaming_client(client):
+    """Route the API's AI service to a FakeStreamingClient replying with the given dict"""
+    def install(reply: dict) -> FakeStreamingClient:
+        fake = FakeStreamingClient(json.dumps(reply))
+        service = AIInsightsService()
+        service._client, service._client_ready = fake, True
+        app.dependency_overrides[get_ai_service] = lambda: service
+        return fake
+
+    yield install
+    app.dependency_overrides.pop(get_ai_service, None)
+
+
+def _sse_events(response) -> list:
+    """(event, data) pairs of a Server-Sent Events body"""
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.split("\n\n"):
+        if block:
+            event, data = block.split("\n")
+            events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_portfolio_stream_falls_back_to_the_mock_insight(client, accounts):
+    events = _sse_events(client.post("/insights/portfolio/stream"))
+    assert [event for event, _ in events] == ["insight"]
+    insight = schemas.PortfolioInsight.model_validate(events[0][1])
+    assert insight.summary
+
+
+def test_portfolio_stream_relays_deltas_then_the_insight(client, accounts, streaming_client):
+    reply = {
+        "summary": "Portfolio is stable",
+        "key_findings": ["Most ARR is Green"],
+        "top_risks": ["Two renewals at risk"],
+        "opportunities": ["Expand in Enterprise"],
+    }
+    fake = streaming_client(reply)
+
+    events = _sse_events(client.post("/insights/portfolio/stream"))
+    assert [event for event, _ in events] == ["delta"] * len(fake.pieces) + ["insight"]
+    assert "".join(data for _, data in events[:-1]) == json.dumps(reply)
+    insight = schemas.PortfolioInsight.model_validate(events[-1][1])
+    assert insight.model_dump(exclude={"generated_at"}) == reply
+    assert fake.requests[0]["stream"] is True
+
+
+def test_account_stream_falls_back_to_the_mock_insight(client, accounts):
+    account = accounts[0]
+    events = _sse_events(client.post(f"/insights/account/{account['id']}/stream"))
+    assert [event for event, _ in events] == ["insight"]
+    insight = schemas.AccountInsight.model_validate(events[0][1])
+    assert (insight.account_id, insight.account_name) == (account["id"], account["name"])
+
+
+def test_account_stream_relays_deltas_then_the_insight(client, accounts, streaming_client):
+    account = accounts[0]
+    reply = {
+        "summary": "Healthy and growing",
+        "health_analysis": ["Adoption is high", "Few tickets", "Recent QBR"],
+        "recommended_actions": [{
+            "title": "Plan expansion", "description": "Offer more seats",
+            "priority": "High", "estimated_impact": "More ARR",
+        }],
+    }
+    fake = streaming_client(reply)
+
+    events = _sse_events(client.post(f"/insights/account/{account['id']}/stream"))
+    assert [event for event, _ in events] == ["delta"] * len(fake.pieces) + ["insight"]
+    assert "".join(data for _, data in events[:-1]) == json.dumps(reply)
+    insight = schemas.AccountInsight.model_validate(events[-1][1])
+    assert (insight.account_id, insight.account_name) == (account["id"], account["name"])
+    assert (insight.summary, insight.health_analysis) == (reply["summary"], reply["health_analysis"])
+    assert [action.title for action in insight.recommended_actions] == ["Plan expansion"]
+
+
+def test_account_stream_of_missing_account_is_404(client, streaming_client):
+    fake = streaming_client({})
+    response = client.post("/insights/account/999/stream")
+    assert (response.status_code, response.json()) == (404, {"detail": "Account not found"})
+    assert fake.requests == []
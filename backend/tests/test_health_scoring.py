@@ -0,0 +1,232 @@
+"""
+Health scoring: the vectorized engine and the recompute that stores it.
+"""
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from sqlmodel import select
+
+from app import health_scoring, models
+from app.health_scoring import normalize
+
+
+def _add_account(db, name: str, **fields) -> models.Account:
+    account = models.Account(name=name, arr=10000, segment=models.SegmentEnum.SMB, **fields)
+    db.add(account)
+    db.commit()
+    db.refresh(account)
+    return account
+
+
+# ==================== Vectorized scoring ====================
+
+def _reference_score(a: dict):
+    """
+    The original per-account scoring loop, kept as the reference the
+    vectorized engine must reproduce: (score, top factor dicts, label).
+    """
+    factors = []
+
+    def add(name, impact):
+        factors.append({"factor": name, "impact": round(impact, 1)})
+
+    base = 0.0
+    ratio = min(1.2, a["active_users"] / max(1, a["seats_purchased"]))
+    ratio_score = min(1.0, ratio / 1.2) * 20
+    base += ratio_score
+    if ratio >= 0.9:
+        add("Strong user adoption", ratio_score)
+    elif ratio < 0.3:
+        add("Low user adoption", ratio_score - 20)
+    else:
+        add("Moderate user adoption", ratio_score - 10)
+
+    feature_score = a["feature_x_adoption"] * 10
+    base += feature_score
+    if a["feature_x_adoption"] >= 0.7:
+        add("High feature adoption", feature_score)
+    elif a["feature_x_adoption"] < 0.3:
+        add("Low feature adoption", feature_score - 10)
+
+    weekly_score = a["weekly_active_pct"] * 5
+    base += weekly_score
+    if a["weekly_active_pct"] < 0.3:
+        add("Low weekly engagement", weekly_score - 5)
+
+    base += float(normalize(a["active_users"] * 0.5 + 15, 5, 40)) * 10
+
+    ttv = a["time_to_value_days"]
+    if ttv is not None:
+        ttv_score = float(normalize(ttv, 7, 90, inverse=True)) * 10
+        base += ttv_score
+        if ttv <= 30:
+            add("Fast time to value", ttv_score)
+        elif ttv > 60:
+            add("Slow time to value", ttv_score - 10)
+    else:
+        base += 5
+
+    tickets_score = float(normalize(a["tickets_last_30d"], 0, 30, inverse=True)) * 8
+    base += tickets_score
+    if a["tickets_last_30d"] > 15:
+        add("High ticket volume", tickets_score - 8)
+    elif a["tickets_last_30d"] == 0:
+        add("Zero support tickets", tickets_score)
+
+    critical_score = float(normalize(a["critical_tickets_90d"], 0, 5, inverse=True)) * 8
+    base += critical_score
+    if a["critical_tickets_90d"] > 2:
+        add("Multiple critical issues", critical_score - 8)
+
+    sla_score = float(normalize(a["sla_breaches_90d"], 0, 3, inverse=True)) * 4
+    base += sla_score
+    if a["sla_breaches_90d"] > 1:
+        add("SLA breaches", sla_score - 4)
+
+    if a["nps"] is not None:
+        nps_score = (a["nps"] + 100) / 200 * 15
+        base += nps_score
+        if a["nps"] >= 50:
+            add("Promoter NPS", nps_score)
+        elif a["nps"] < 0:
+            add("Detractor NPS", nps_score - 15)
+    else:
+        base += 7.5
+
+    if a["qbr_last_date"]:
+        days_since_qbr = (date.today() - a["qbr_last_date"]).days
+        qbr_score = float(normalize(days_since_qbr, 0, 120, inverse=True)) * 5
+        base += qbr_score
+        if days_since_qbr > 90:
+            add("Overdue QBR", qbr_score - 5)
+    else:
+        add("No QBR history", -5)
+
+    if a["onboarding_phase"] and ttv and ttv > 30:
+        add("Extended onboarding", -5)
+    else:
+        base += 5
+
+    bonus = 0.0
+    if a["expansion_oppty_dollar"] > 0 and a["arr"] > 0:
+        expansion_bonus = min(10, a["expansion_oppty_dollar"] / a["arr"] * 20)
+        bonus += expansion_bonus
+        if expansion_bonus >= 5:
+            add("Strong expansion opportunity", expansion_bonus)
+    if a["renewal_date"]:
+        days_to_renewal = (a["renewal_date"] - date.today()).days
+        if 0 <= days_to_renewal <= 60 and ratio < 0.5:
+            bonus -= 5
+            add("Renewal risk: low adoption", -5)
+
+    score = max(0, min(110, base + bonus))
+    label = "Green" if score >= 75 else "Amber" if score >= 50 else "Red"
+    factors.sort(key=lambda f: abs(f["impact"]), reverse=True)
+    return score, factors[:10], label
+
+
+def _random_account(rng: random.Random) -> dict:
+    today = date.today()
+
+    def maybe(value):
+        return None if rng.random() < 0.2 else value
+
+    return {
+        "active_users": rng.randint(0, 150),
+        "seats_purchased": rng.choice([0, 1, 10, 50, 100]),
+        "feature_x_adoption": rng.choice([0.0, 0.3, 0.7, rng.random()]),
+        "weekly_active_pct": rng.choice([0.0, 0.3, rng.random()]),
+        "time_to_value_days": maybe(rng.choice([0, 7, 30, 31, 60, 61, 90, rng.randint(0, 150)])),
+        "tickets_last_30d": rng.choice([0, 15, 16, rng.randint(0, 40)]),
+        "critical_tickets_90d": rng.randint(0, 7),
+        "sla_breaches_90d": rng.randint(0, 4),
+        "nps": maybe(rng.choice([-100, -1, 0, 50, 100, rng.randint(-100, 100)])),
+        "qbr_last_date": maybe(today - timedelta(days=rng.choice([0, 90, 91, rng.randint(0, 200)]))),
+        "onboarding_phase": rng.random() < 0.3,
+        "expansion_oppty_dollar": rng.choice([0.0, 25000.0, rng.uniform(0, 80000)]),
+        "arr": rng.choice([0.0, 100000.0, rng.uniform(1000, 500000)]),
+        "renewal_date": maybe(today + timedelta(days=rng.choice([-1, 0, 60, 61, rng.randint(-30, 120)]))),
+    }
+
+
+def test_vectorized_scores_match_the_reference():
+    accounts = [_random_account(random.Random(seed)) for seed in range(500)]
+    columns = {col: [a[col] for a in accounts] for col in health_scoring.SCORING_COLUMNS}
+
+    scores, labels, impacts = health_scoring.calculate_health_scores_vec(columns)
+    top_factors = health_scoring.top_factor_dicts_bulk(impacts)
+
+    for i, account in enumerate(accounts):
+        score, factors, label = _reference_score(account)
+        assert scores[i] == pytest.approx(score), account
+        assert labels[i] == label, account
+        assert top_factors[i] == factors, account
+
+
+def _impact_row(**impacts) -> np.ndarray:
+    """One account's impact row with the named factors fired"""
+    row = np.full(len(health_scoring.FACTOR_NAMES), np.nan)
+    for name, impact in impacts.items():
+        row[health_scoring.FACTOR_NAMES.index(name.replace("_", " "))] = impact
+    return row
+
+
+def _ranked(impacts: np.ndarray, limit: int = 10) -> list:
+    return [
+        [(f["factor"], f["impact"]) for f in factors]
+        for factors in health_scoring.top_factor_dicts_bulk(impacts, limit)
+    ]
+
+
+def test_tied_impacts_keep_factor_order():
+    # Ties in absolute impact, including +x against -x and values that only
+    # tie after rounding, keep FACTOR_NAMES order
+    row = _impact_row(
+        Zero_support_tickets=4.0, Promoter_NPS=-4.0, Low_weekly_engagement=4.04,
+        Overdue_QBR=-1.2, SLA_breaches=1.2,
+    )
+    assert _ranked(row[np.newaxis, :]) == [[
+        ("Low weekly engagement", 4.0), ("Zero support tickets", 4.0), ("Promoter NPS", -4.0),
+        ("SLA breaches", 1.2), ("Overdue QBR", -1.2),
+    ]]
+
+
+def test_all_positive_and_all_negative_factors():
+    impacts = np.vstack([
+        _impact_row(Strong_user_adoption=20.0, Fast_time_to_value=6.3, Promoter_NPS=12.8),
+        _impact_row(Low_user_adoption=-18.0, No_QBR_history=-5.0, Detractor_NPS=-9.75),
+    ])
+    assert _ranked(impacts) == [
+        [("Strong user adoption", 20.0), ("Promoter NPS", 12.8), ("Fast time to value", 6.3)],
+        [("Low user adoption", -18.0), ("Detractor NPS", -9.8), ("No QBR history", -5.0)],
+    ]
+
+
+def test_top_factors_respect_the_limit_and_skip_unfired():
+    impacts = np.vstack([
+        _impact_row(Strong_user_adoption=1.0, High_feature_adoption=3.0, Promoter_NPS=2.0),
+        _impact_row(),
+    ])
+    assert _ranked(impacts, limit=2) == [
+        [("High feature adoption", 3.0), ("Promoter NPS", 2.0)],
+        [],
+    ]
+
+
+# ==================== Recompute ====================
+
+def test_scoped_recompute_leaves_other_accounts_alone(db):
+    unscored = _add_account(db, "Unscored")
+    scored = _add_account(db, "Scored", active_users=50, seats_purchased=50)
+
+    assert health_scoring.recompute_health_scores(db, [scored.id]) == 1
+    db.expire_all()
+    assert (unscored.health_score, unscored.health_bucket) == (0.0, None)
+    assert scored.health_bucket is not None
+    assert db.exec(select(models.HealthSnapshot.account_id)).all() == [scored.id]
+
+    health_scoring.recompute_health_scores(db)
+    db.expire_all()
+    assert unscored.health_bucket is not None
@@ -0,0 +1,147 @@
+"""
+Round trips of CSV uploads through app.ingestion on SQLite.
+"""
+import io
+from datetime import date
+
+import pytest
+from sqlmodel import select
+
+from app import ingestion, models
+
+HEADER = "name,arr,segment,region,renewal_date,active_users,seats_purchased,nps,renewal_risk,date,logins,errors\n"
+
+
+@pytest.fixture(params=["pyarrow", "pandas"])
+def ingest(request, db, monkeypatch):
+    """Upload CSV text through either parser and return ingest_chunks' result"""
+    if request.param == "pyarrow" and not ingestion.PYARROW_AVAILABLE:
+        pytest.skip("pyarrow not installed")
+    monkeypatch.setattr(ingestion, "PYARROW_AVAILABLE", request.param == "pyarrow")
+
+    def upload(text: str):
+        chunks = ingestion.read_csv_chunks(io.BytesIO(text.encode()))
+        return ingestion.ingest_chunks(db, chunks)
+    return upload
+
+
+def _account(db, name: str) -> models.Account:
+    db.expire_all()
+    return db.exec(select(models.Account).where(models.Account.name == name)).one()
+
+
+def _metric_days(db, account_id: int) -> dict:
+    rows = db.exec(
+        select(models.AccountMetricsDaily).where(models.AccountMetricsDaily.account_id == account_id)
+    ).all()
+    return {row.date: row.logins for row in rows}
+
+
+def test_create_accounts_and_metrics(db, ingest):
+    created, updated, metrics, errors = ingest(
+        HEADER
+        + "Acme,500000,Enterprise,US,2025-12-15,120,100,65,Low,2025-01-01,10,1\n"
+        + "Acme,500000,Enterprise,US,2025-12-15,120,100,65,Low,2025-01-02,12,0\n"
+        + "Beta,50000,SMB,,,8,25,,,2025-01-01,3,\n"
+    )
+    assert (created, updated, metrics, errors) == (2, 0, 3, [])
+
+    acme = _account(db, "Acme")
+    assert acme.segment == models.SegmentEnum.ENT
+    assert acme.renewal_date == date(2025, 12, 15)
+    assert acme.renewal_risk == models.RenewalRiskEnum.LOW
+    assert acme.health_bucket is not None
+    assert _metric_days(db, acme.id) == {date(2025, 1, 1): 10, date(2025, 1, 2): 12}
+
+    # Blank optional cells take the model defaults
+    beta = _account(db, "Beta")
+    assert (beta.region, beta.renewal_date, beta.nps, beta.renewal_risk) == (None, None, None, None)
+
+    snapshots = db.exec(select(models.HealthSnapshot)).all()
+    assert sorted(s.account_id for s in snapshots) == sorted([acme.id, beta.id])
+
+
+def test_update_keeps_values_for_blank_cells(db, ingest):
+    ingest(HEADER + "Acme,500000,Enterprise,US,2025-12-15,120,100,65,Low,,,\n")
+    created, updated, metrics, errors = ingest(
+        HEADER + "Acme,600000,Enterprise,,,130,100,,,,,\n"
+    )
+    assert (created, updated, metrics, errors) == (0, 1, 0, [])
+
+    acme = _account(db, "Acme")
+    assert (acme.arr, acme.active_users) == (600000, 130)
+    assert (acme.region, acme.renewal_date, acme.nps) == ("US", date(2025, 12, 15), 65)
+
+
+def test_duplicate_metric_days_are_skipped(db, ingest):
+    row = "Acme,500000,Enterprise,US,2025-12-15,120,100,65,Low,2025-01-01,{},0\n"
+    _, _, metrics, _ = ingest(HEADER + row.format(10) + row.format(99))
+    assert metrics == 1
+
+    # A re-upload of a stored day keeps the original row
+    _, _, metrics, _ = ingest(HEADER + row.format(50))
+    assert metrics == 0
+    assert _metric_days(db, _account(db, "Acme").id) == {date(2025, 1, 1): 10}
+
+
+def test_bad_cell_skips_only_that_account(db, ingest):
+    created, _, metrics, errors = ingest(
+        HEADER
+        + "Acme,500000,Enterprise,US,,120,100,,,2025-01-01,10,0\n"
+        + "Broken,1000,Galactic,US,,1,1,,,2025-01-01,5,0\n"
+    )
+    assert (created, metrics) == (1, 1)
+    assert len(errors) == 1 and errors[0].startswith("Error processing account Broken")
+    assert db.exec(select(models.Account.name)).all() == ["Acme"]
+
+
+def test_non_iso_dates_are_parsed(db, ingest):
+    ingest(HEADER + "Acme,500000,Enterprise,US,12/15/2025,120,100,,,01/02/2025,10,0\n")
+    acme = _account(db, "Acme")
+    assert acme.renewal_date == date(2025, 12, 15)
+    assert _metric_days(db, acme.id) == {date(2025, 1, 2): 10}
+
+
+def test_failed_chunk_rolls_back_upload(db):
+    def chunks():
+        yield from ingestion.read_csv_chunks(io.BytesIO(
+            (HEADER + "Acme,500000,Enterprise,US,,120,100,,,2025-01-01,10,0\n").encode()
+        ))
+        raise RuntimeError("upload interrupted")
+
+    with pytest.raises(RuntimeError):
+        ingestion.ingest_chunks(db, chunks())
+    assert db.exec(select(models.Account)).all() == []
+    assert db.exec(select(models.AccountMetricsDaily)).all() == []
+
+
+def test_fractional_int_cells_truncate(db, ingest):
+    created, _, _, errors = ingest(HEADER + "Acme,500000,Enterprise,US,,3.5,10.0,,,2025-01-01,10,0\n")
+    assert (created, errors) == (1, [])
+    acme = _account(db, "Acme")
+    assert (acme.active_users, acme.seats_purchased) == (3, 10)
+
+
+def test_bad_numeric_cell_skips_only_that_account(db, ingest):
+    created, _, metrics, errors = ingest(
+        HEADER
+        + "Acme,500000,Enterprise,US,,120,100,,,2025-01-01,10,0\n"
+        + "Broken,bad,SMB,US,,1,1,,,2025-01-01,5,0\n"
+        + "Sloppy,1000,SMB,US,,lots,1,,,2025-01-01,5,0\n"
+    )
+    assert (created, metrics) == (1, 1)
+    assert errors == [
+        "Error processing account Broken: invalid arr value 'bad'",
+        "Error processing account Sloppy: invalid active_users value 'lots'",
+    ]
+    assert db.exec(select(models.Account.name)).all() == ["Acme"]
+
+
+def test_bad_metric_cell_takes_the_column_default(db, ingest):
+    created, _, metrics, errors = ingest(
+        HEADER
+        + "Acme,500000,Enterprise,US,,120,100,,,2025-01-01,lots,0\n"
+        + "Acme,500000,Enterprise,US,,120,100,,,2025-01-02,7.9,oops\n"
+    )
+    assert (created, metrics, errors) == (1, 2, [])
+    assert _metric_days(db, _account(db, "Acme").id) == {date(2025, 1, 1): 0, date(2025, 1, 2): 7}
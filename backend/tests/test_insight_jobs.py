@@ -0,0 +1,110 @@
+"""
+Coalescing and eviction in the in-process insight job registry.
+"""
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from app import insight_jobs
+
+
+@pytest.fixture(autouse=True)
+def empty_registry(monkeypatch):
+    monkeypatch.setattr(insight_jobs, "_jobs", OrderedDict())
+    monkeypatch.setattr(insight_jobs, "_inflight", {})
+
+
+def test_identical_requests_share_one_job():
+    calls = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def factory():
+            calls.append(1)
+            await release.wait()
+            return "insight"
+
+        first = insight_jobs.submit("key", factory)
+        second = insight_jobs.submit("key", factory)
+        other = insight_jobs.submit("other", factory)
+        assert second is first and other is not first
+        assert first.status == "pending"
+
+        waiter = asyncio.ensure_future(insight_jobs.run("key", factory))
+        await asyncio.sleep(0)
+        release.set()
+        assert await waiter == "insight"
+        await other.task
+
+        assert (first.status, first.result, first.error) == ("completed", "insight", None)
+        # Once finished, the same key starts a new job
+        again = insight_jobs.submit("key", factory)
+        assert again is not first
+        await again.task
+        return first
+
+    first = asyncio.run(main())
+    assert len(calls) == 3
+    assert insight_jobs.get(first.job_id) is first
+
+
+def test_failed_job_reports_error_and_is_not_reused():
+    async def main():
+        async def factory():
+            raise ValueError("OpenAI unavailable")
+
+        job = insight_jobs.submit("key", factory)
+        await asyncio.gather(job.task, return_exceptions=True)
+        assert (job.status, job.result, job.error) == ("failed", None, "OpenAI unavailable")
+        assert insight_jobs.submit("key", factory) is not job
+
+    asyncio.run(main())
+
+
+def test_oldest_finished_jobs_are_evicted_at_max_jobs(monkeypatch):
+    monkeypatch.setattr(insight_jobs, "MAX_JOBS", 3)
+
+    async def main():
+        async def done():
+            return "ok"
+
+        jobs = [insight_jobs.submit(i, done) for i in range(3)]
+        await asyncio.gather(*(job.task for job in jobs))
+
+        newest = insight_jobs.submit(3, done)
+        await newest.task
+        assert insight_jobs.get(jobs[0].job_id) is None
+        assert [insight_jobs.get(job.job_id) for job in jobs[1:] + [newest]] == jobs[1:] + [newest]
+
+    asyncio.run(main())
+
+
+def test_pending_jobs_are_never_evicted(monkeypatch):
+    monkeypatch.setattr(insight_jobs, "MAX_JOBS", 2)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+
+        async def done():
+            return "ok"
+
+        pending = insight_jobs.submit("slow", slow)
+        finished = [insight_jobs.submit(i, done) for i in range(3)]
+        await asyncio.gather(*(job.task for job in finished))
+
+        # The oldest job is still running, so nothing behind it is dropped
+        assert insight_jobs.get(pending.job_id) is pending
+        assert len(insight_jobs._jobs) == 4
+
+        release.set()
+        await pending.task
+        insight_jobs.submit("next", done)
+        assert insight_jobs.get(pending.job_id) is None
+        assert len(insight_jobs._jobs) == 2
+
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Playbook recommendations: matching, scoring and the per-input cache.
+"""
+from app import playbooks
+from app.health_scoring import FACTOR_NAMES
+
+
+def _linear_scan(risk_factors, top_n=5):
+    """The original matching: every playbook's phrases against every factor"""
+    recommendations = []
+    for playbook_data in playbooks.PLAYBOOKS_LIBRARY:
+        matching = [
+            rf for rf in risk_factors
+            if any(prf.lower() in rf.lower() for prf in playbook_data["risk_factors"])
+        ]
+        if matching:
+            score = len(matching) / len(risk_factors)
+            score += {"High": 0.2, "Medium": 0.1, "Low": 0.0}.get(playbook_data["priority"], 0)
+            recommendations.append((playbook_data["id"], round(min(1.0, score), 2), matching))
+    recommendations.sort(key=lambda r: r[1], reverse=True)
+    return recommendations[:top_n]
+
+
+def _recommended(risk_factors, top_n=5):
+    return [
+        (r.playbook.id, r.relevance_score, r.matching_risk_factors)
+        for r in playbooks.recommend_playbooks(risk_factors, top_n)
+    ]
+
+
+def test_index_lookup_matches_the_linear_scan():
+    phrases = sorted({prf for p in playbooks.PLAYBOOKS_LIBRARY for prf in p["risk_factors"]})
+    cases = [[phrase] for phrase in phrases] + [[name] for name in FACTOR_NAMES] + [
+        phrases,
+        list(FACTOR_NAMES),
+        ["LOW FEATURE ADOPTION"],
+        ["Critical health score: low feature adoption and high support ticket volume"],
+        ["Low feature adoption", "Low feature adoption", "Unrelated signal"],
+        ["Nothing matches here"],
+    ]
+    for risk_factors in cases:
+        for top_n in (1, 5, len(playbooks.PLAYBOOKS_LIBRARY)):
+            assert _recommended(risk_factors, top_n) == _linear_scan(risk_factors, top_n), risk_factors
+
+
+def test_cached_recommendations_are_not_shared():
+    factors = ["Low feature adoption", "High support ticket volume"]
+    first = playbooks.recommend_playbooks(factors)
+    second = playbooks.recommend_playbooks(factors)
+    assert first and first == second
+    assert all(a is not b for a, b in zip(first, second))
+    assert all(a.playbook is not b.playbook for a, b in zip(first, second))
+
+    # Mutating one caller's result leaves the cache and the library intact
+    first[0].matching_risk_factors.append("Tampered")
+    first[0].playbook.steps.clear()
+    third = playbooks.recommend_playbooks(factors)
+    assert third == second
+    library = {p["id"]: p for p in playbooks.PLAYBOOKS_LIBRARY}
+    assert third[0].playbook.steps == library[third[0].playbook.id]["steps"]